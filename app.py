@@ -1,6 +1,8 @@
 # app.py
 
 import sys
+import time
+import threading
 import subprocess
 import importlib.util
 from pathlib import Path
@@ -34,16 +36,22 @@ def ensure_requirements():
             [sys.executable, "-m", "pip", "install", *missing]
         )
 
-ensure_requirements()
+# OCR worker processes re-import this module when they are spawned
+# (Windows, macOS), so nothing may run at import time
+if __name__ == "__main__":
+    ensure_requirements()
 
 # --------------------------------------------------
 # Imports from src
 # --------------------------------------------------
 
+from src.config import DASHBOARD_JOB_BATCH_SIZE
+from src.database import init_db
 from src.ingest import run_pipeline
+from src.parse import parse_admission_number
 from src.query import (
-    get_all_students,
-    get_students_by_category,
+    count_students,
+    get_students_page,
     allocate_student,
     unallocate_student,
 )
@@ -53,11 +61,16 @@ from src.query import (
 # --------------------------------------------------
 
 def main(page: ft.Page):
+    # Bring an older data/volunteer.db up to the current schema
+    # (the table reads columns added by later migrations)
+    init_db()
+
     page.title = "Volunteer Management Dashboard"
     page.theme_mode = ft.ThemeMode.LIGHT
     page.scroll = ft.ScrollMode.AUTO
 
     status_text = ft.Text("Loaded from local database.")
+    progress_bar = ft.ProgressBar(width=300, value=0, visible=False)
 
     # ---------------- Categories ----------------
 
@@ -74,6 +87,8 @@ def main(page: ft.Page):
         for cat in categories
     }
 
+    match_all_categories = ft.Checkbox(label="Must have all selected", value=False)
+
     def get_selected_categories():
         return [cat for cat, cb in category_checks.items() if cb.value]
 
@@ -82,16 +97,48 @@ def main(page: ft.Page):
     allocation_filter_allocated = ft.Checkbox(label="Allocated", value=True)
     allocation_filter_unallocated = ft.Checkbox(label="Unallocated", value=True)
 
-    def allocation_filter(row):
-        is_allocated = row["allocated"] == 1
+    def allocation_filter():
+        # Both or neither ticked: no filter
+        allocated = allocation_filter_allocated.value
+        unallocated = allocation_filter_unallocated.value
+
+        if allocated and not unallocated:
+            return "allocated"
+        if unallocated and not allocated:
+            return "unallocated"
+        return None
+
+    # ---------------- Confidence / event filters ----------------
+
+    min_confidence_slider = ft.Slider(
+        min=0,
+        max=1,
+        divisions=20,
+        value=0,
+        label="{value}",
+        width=250,
+    )
 
-        if allocation_filter_allocated.value and allocation_filter_unallocated.value:
-            return True
-        if allocation_filter_allocated.value:
-            return is_allocated
-        if allocation_filter_unallocated.value:
-            return not is_allocated
-        return True
+    event_filter_dropdown = ft.Dropdown(
+        label="Allocated To",
+        options=[ft.dropdown.Option("Any")]
+        + [ft.dropdown.Option(cat) for cat in categories],
+        value="Any",
+        width=250
+    )
+
+    def current_filters():
+        """The dashboard filters, as arguments for the src/query.py functions."""
+        return {
+            "categories": get_selected_categories(),
+            "match": "all" if match_all_categories.value else "any",
+            "allocation": allocation_filter(),
+            "min_confidence": min_confidence_slider.value or None,
+            "event": (
+                None if event_filter_dropdown.value == "Any"
+                else event_filter_dropdown.value
+            ),
+        }
 
     # ---------------- Allocation category selector ----------------
 
@@ -102,103 +149,250 @@ def main(page: ft.Page):
         width=250
     )
 
-    # ---------------- Table container ----------------
+    # ---------------- Table ----------------
 
-    table_container = ft.Column()
+    # Sort key (see STUDENT_SORT_KEYS) per column; None = not sortable
+    column_sort_keys = [
+        "name", "course", "year", "phone", "confidence", "allocated", "event", None
+    ]
+
+    # Only the current page is loaded and rendered. cursors holds the
+    # keyset cursor each visited page starts after (None = first page);
+    # rows maps each shown email to its (DataRow, row dict).
+    view = {
+        "sort": "name",
+        "descending": False,
+        "cursors": [None],
+        "next": None,
+        "total": 0,
+        "rows": {},
+    }
+
+    page_size_dropdown = ft.Dropdown(
+        label="Rows per page",
+        options=[ft.dropdown.Option(str(n)) for n in (25, 50, 100, 200)],
+        value="50",
+        width=150,
+    )
+
+    page_label = ft.Text()
+    prev_page_button = ft.Button("Previous")
+    next_page_button = ft.Button("Next")
+
+    def sort_by(e):
+        view["sort"] = column_sort_keys[e.column_index]
+        view["descending"] = not e.ascending
+        table.sort_column_index = e.column_index
+        table.sort_ascending = e.ascending
+        load_local_data()
+
+    def column(label, sort_key):
+        return ft.DataColumn(
+            ft.Text(label),
+            on_sort=sort_by if sort_key else None,
+        )
+
+    table = ft.DataTable(
+        columns=[
+            column(label, key)
+            for label, key in zip(
+                ["Name", "Course", "Year", "Phone", "Confidence", "Allocated",
+                 "Allocated Category", "Action"],
+                column_sort_keys,
+            )
+        ],
+        rows=[],
+        sort_column_index=0,
+        sort_ascending=True,
+    )
 
     # ---------------- Core logic ----------------
 
     def load_local_data(e=None):
-        selected = get_selected_categories()
+        """Filters or sort changed: count the matches, show the first page."""
+        view["cursors"] = [None]
+        view["total"] = count_students(**current_filters())
+        show_page()
+
+    def show_page():
+        page_size = int(page_size_dropdown.value)
+
+        data, view["next"] = get_students_page(
+            sort=view["sort"],
+            descending=view["descending"],
+            limit=page_size,
+            after=view["cursors"][-1],
+            **current_filters(),
+        )
+        build_table(data)
 
-        if not selected:
-            data = get_all_students()
-        else:
-            seen = {}
-            for cat in selected:
-                for row in get_students_by_category(cat):
-                    seen[row["email"]] = row
-            data = list(seen.values())
+        pages = max(1, -(-view["total"] // page_size))
+        page_label.value = (
+            f"Page {len(view['cursors'])} of {pages} "
+            f"({view['total']} students)"
+        )
+        prev_page_button.disabled = len(view["cursors"]) == 1
+        next_page_button.disabled = view["next"] is None
+        page.update()
 
-        data = [row for row in data if allocation_filter(row)]
-        build_table(data)
+    def next_page(e):
+        view["cursors"].append(view["next"])
+        show_page()
 
-    def build_table(data):
-        rows = []
-
-        for row in data:
-            is_allocated = row["allocated"] == 1
-            allocated_event = row["allocated_event"] or "-"
-
-            def make_toggle(email, allocated):
-                return lambda e: toggle_allocation(email, allocated)
-
-            rows.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(row["ocr_name"] or "—")),
-                        ft.DataCell(
-                            ft.Text(
-                                row["ocr_admission_no"][:3]
-                                if row["ocr_admission_no"] else "—"
-                            )
-                        ),
-                        ft.DataCell(
-                            ft.Text(
-                                str(row["computed_year_of_study"])
-                                if row["computed_year_of_study"] else "—"
-                            )
-                        ),
-                        ft.DataCell(ft.Text(row["ocr_phone"] or "—")),
-                        ft.DataCell(ft.Text("Yes" if is_allocated else "No")),
-                        ft.DataCell(ft.Text(allocated_event)),
-                        ft.DataCell(
-                            ft.Button(
-                                "Unallocate" if is_allocated else "Allocate",
-                                on_click=make_toggle(row["email"], is_allocated),
-                            )
-                        ),
-                    ]
+    def prev_page(e):
+        view["cursors"].pop()
+        show_page()
+
+    prev_page_button.on_click = prev_page
+    next_page_button.on_click = next_page
+    page_size_dropdown.on_select = load_local_data
+
+    def row_cells(row):
+        is_allocated = row["allocated"] == 1
+        allocated_event = row["allocated_event"] or "-"
+        confidence = row["overall_confidence"]
+        admission = parse_admission_number(row["ocr_admission_no"] or "")
+
+        return [
+            ft.DataCell(ft.Text(row["ocr_name"] or "—")),
+            ft.DataCell(
+                ft.Text(admission["course_code"] if admission else "—")
+            ),
+            ft.DataCell(
+                ft.Text(
+                    str(row["computed_year_of_study"])
+                    if row["computed_year_of_study"] else "—"
                 )
-            )
+            ),
+            ft.DataCell(ft.Text(row["ocr_phone"] or "—")),
+            ft.DataCell(
+                ft.Text(f"{confidence:.2f}" if confidence is not None else "—")
+            ),
+            ft.DataCell(ft.Text("Yes" if is_allocated else "No")),
+            ft.DataCell(ft.Text(allocated_event)),
+            ft.DataCell(
+                ft.Button(
+                    "Unallocate" if is_allocated else "Allocate",
+                    on_click=lambda e, email=row["email"]: toggle_allocation(email),
+                )
+            ),
+        ]
+
+    def build_table(data):
+        view["rows"] = {
+            row["email"]: (ft.DataRow(cells=row_cells(row)), row)
+            for row in data
+        }
+        table.rows = [data_row for data_row, _ in view["rows"].values()]
+
+    # ---------------- Background ingestion ----------------
+
+    # Ingestion runs on a worker thread so the table stays usable;
+    # cancel is the running refresh's threading.Event (None when idle)
+    ingest = {"cancel": None, "stage": None, "last_update": 0.0}
+
+    stage_labels = {
+        "sheet_fetch": "Reading the Google Sheet",
+        "download": "Downloading ID cards",
+        "ocr": "Reading ID cards",
+        "parse": "Parsing",
+        "persist": "Saving",
+    }
 
-        table = ft.DataTable(
-            columns=[
-                ft.DataColumn(ft.Text("Name")),
-                ft.DataColumn(ft.Text("Course")),
-                ft.DataColumn(ft.Text("Year")),
-                ft.DataColumn(ft.Text("Phone")),
-                ft.DataColumn(ft.Text("Allocated")),
-                ft.DataColumn(ft.Text("Allocated Category")),
-                ft.DataColumn(ft.Text("Action")),
-            ],
-            rows=rows,
+    def show_progress(event):
+        # Called from the ingestion threads; redraw at most ~10 times a second
+        stage = event["stage"]
+        now = time.monotonic()
+        if stage == ingest["stage"] and now - ingest["last_update"] < 0.1:
+            return
+        ingest["stage"], ingest["last_update"] = stage, now
+
+        if stage not in stage_labels:
+            return
+
+        text = stage_labels[stage]
+        if event["stage_total"]:
+            text += f" {event['stage_done']}/{event['stage_total']}"
+        if event["total"]:
+            text += f" · {event['done']}/{event['total']} rows done"
+        if event["failed"]:
+            text += f", {event['failed']} failed"
+
+        status_text.value = text
+        progress_bar.value = (
+            event["done"] / event["total"] if event["total"] else None
         )
+        status_text.update()
+        progress_bar.update()
+
+    def run_ingestion(cancel):
+        try:
+            run_pipeline(
+                progress=show_progress,
+                cancel=cancel,
+                batch_size=DASHBOARD_JOB_BATCH_SIZE,
+            )
+            if ingest["stage"] == "cancelled":
+                status_text.value = (
+                    "Refresh cancelled; unfinished rows resume on the next fetch"
+                )
+            else:
+                status_text.value = (
+                    f"Sheet refreshed at {datetime.now().strftime('%H:%M:%S')}"
+                )
+        except Exception as ex:
+            status_text.value = f"Error: {ex}"
 
-        table_container.controls = [table]
-        table_container.update()
+        ingest["cancel"] = None
+        fetch_sheet_button.disabled = False
+        cancel_button.visible = False
+        progress_bar.visible = False
+
+        # Refresh the page being looked at, without jumping back to page 1
+        view["total"] = count_students(**current_filters())
+        show_page()
 
     def refresh_from_sheet(e):
+        if ingest["cancel"] is not None:
+            return
+
+        ingest["cancel"] = threading.Event()
+        ingest["stage"] = None
+
+        fetch_sheet_button.disabled = True
+        cancel_button.disabled = False
+        cancel_button.visible = True
+        progress_bar.value = None
+        progress_bar.visible = True
         status_text.value = "Fetching data from Google Sheet..."
         page.update()
 
-        try:
-            run_pipeline()
-            status_text.value = (
-                f"Sheet refreshed at {datetime.now().strftime('%H:%M:%S')}"
-            )
-        except Exception as ex:
-            status_text.value = f"Error: {ex}"
+        page.run_thread(run_ingestion, ingest["cancel"])
 
-        load_local_data()
+    def cancel_refresh(e):
+        if ingest["cancel"] is None:
+            return
+
+        ingest["cancel"].set()
+        cancel_button.disabled = True
+        status_text.value = "Cancelling after the current step..."
         page.update()
 
-    def toggle_allocation(email, is_allocated):
-        if is_allocated:
+    def toggle_allocation(email):
+        # One UPDATE and one row redraw. The row stays on the page even if
+        # it no longer matches the filters, until they are next applied.
+        data_row, row = view["rows"][email]
+
+        if row["allocated"] == 1:
             unallocate_student(email)
+            row["allocated"], row["allocated_event"] = 0, None
         else:
-            allocate_student(email, allocation_category_dropdown.value)
-        load_local_data()
+            event = allocation_category_dropdown.value
+            allocate_student(email, event)
+            row["allocated"], row["allocated_event"] = 1, event
+
+        data_row.cells = row_cells(row)
+        data_row.update()
 
     # ---------------- UI Controls ----------------
 
@@ -207,6 +401,12 @@ def main(page: ft.Page):
         on_click=refresh_from_sheet,
     )
 
+    cancel_button = ft.Button(
+        "Cancel",
+        on_click=cancel_refresh,
+        visible=False,
+    )
+
     apply_filter_button = ft.Button(
         "Apply Filters",
         on_click=load_local_data,
@@ -217,15 +417,22 @@ def main(page: ft.Page):
     page.add(
         ft.Column(
             [
-                ft.Row([fetch_sheet_button, status_text]),
+                ft.Row([fetch_sheet_button, cancel_button, progress_bar, status_text]),
                 ft.Text("Filter by Category:"),
-                ft.Row(list(category_checks.values())),
+                ft.Row(list(category_checks.values()) + [match_all_categories]),
                 ft.Text("Filter by Allocation Status:"),
-                ft.Row([allocation_filter_allocated, allocation_filter_unallocated]),
+                ft.Row([
+                    allocation_filter_allocated,
+                    allocation_filter_unallocated,
+                    event_filter_dropdown,
+                ]),
+                ft.Text("Minimum Confidence:"),
+                min_confidence_slider,
                 ft.Text("Allocation Category (used when allocating):"),
                 allocation_category_dropdown,
                 apply_filter_button,
-                table_container,
+                ft.Row([page_size_dropdown, prev_page_button, next_page_button, page_label]),
+                table,
             ]
         )
     )
@@ -236,4 +443,5 @@ def main(page: ft.Page):
 # Run
 # --------------------------------------------------
 
-ft.run(main)
+if __name__ == "__main__":
+    ft.run(main)
@@ -0,0 +1,103 @@
+# benchmarks/bench_ocr_backends.py
+#
+# Compares OCR throughput (images per second, single process) of the
+# backends in src/ocr_backends.py on a directory of card images, or on
+# simple generated text cards when no directory is given.
+#
+# Usage:
+#   python -m benchmarks.bench_ocr_backends --images data/raw_images --limit 50
+
+import time
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.ocr_backends import BACKENDS
+
+
+def generated_cards(count: int) -> list:
+    cards = []
+    for i in range(count):
+        card = np.full((400, 640), 255, dtype=np.uint8)
+        lines = [
+            "UNIVERSITY OF DELHI",
+            f"Student's Name: Test Student {i}",
+            f"Admission No: BTH23-27@{152300 + i}",
+            f"Mobile: 98{i:08d}",
+        ]
+        for row, line in enumerate(lines):
+            cv2.putText(
+                card, line, (30, 80 + row * 80),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2
+            )
+        cards.append(card)
+    return cards
+
+
+def load_cards(image_dir: str, limit: int) -> list:
+    # The image cache keeps cards in shard subdirectories
+    paths = sorted(p for p in Path(image_dir).rglob("*") if p.is_file())
+
+    cards = []
+    for path in paths[:limit]:
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            cards.append(image)
+    return cards
+
+
+def bench_backend(name: str, cards: list) -> dict:
+    start = time.perf_counter()
+    backend = BACKENDS[name]()
+    init_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for card in cards:
+        backend.image_to_string(card)
+    run_time = time.perf_counter() - start
+
+    return {
+        "init_s": init_time,
+        "run_s": run_time,
+        "images_per_s": len(cards) / run_time if run_time else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR backends")
+    parser.add_argument("--images", help="directory of card images")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    cards = (
+        load_cards(args.images, args.limit)
+        if args.images else generated_cards(args.limit)
+    )
+    print(f"Images: {len(cards)}\n")
+
+    results = {}
+    for name in BACKENDS:
+        try:
+            results[name] = bench_backend(name, cards)
+        except Exception as e:
+            print(f"{name:<12}: unavailable ({e})")
+            continue
+
+        r = results[name]
+        print(
+            f"{name:<12}: {r['images_per_s']:.2f} images/s "
+            f"(init {r['init_s']:.2f}s, total {r['run_s']:.2f}s)"
+        )
+
+    if len(results) == 2:
+        speedup = (
+            results["tesserocr"]["images_per_s"] /
+            results["pytesseract"]["images_per_s"]
+        )
+        print(f"\ntesserocr speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# benchmarks/bench_pipeline.py
+#
+# End-to-end ingestion benchmark on synthetic ID cards (see
+# synthetic_cards.py). Times each stage on its own: sheet read,
+# download (from a local Drive stand-in), OCR, parsing, validation and
+# upsert; and measures field accuracy against the cards' ground truth.
+# Everything runs in a scratch directory, so data/ is never touched.
+#
+# Throughput and accuracy are compared with a stored baseline; the run
+# fails (exit 1) if either has regressed past the tolerances below, or
+# if OCR failed on every card (e.g. Tesseract missing). Baselines are
+# machine-specific, so none is committed: record one with
+# --save-baseline on the machine that runs the comparison. Without a
+# baseline the run fails (exit 2).
+#
+# Usage:
+#   python -m benchmarks.bench_pipeline --cards 100 --noise 8 --blur 1 --rotation 3
+#   python -m benchmarks.bench_pipeline --save-baseline
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+from pathlib import Path
+
+from benchmarks.synthetic_cards import generate_dataset
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline_pipeline.json")
+
+# A stage may be this much slower than the baseline (relative) ...
+THROUGHPUT_TOLERANCE = 0.25
+# ... and a field this much less accurate (absolute)
+ACCURACY_TOLERANCE = 0.02
+# Stages faster than this in the baseline are too noisy to compare;
+# use more --cards to cover them
+MIN_STAGE_SECONDS = 0.05
+
+FIELDS = ["name", "admission_no", "phone"]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _normalize(value) -> str:
+    return " ".join(str(value or "").upper().split())
+
+
+def run_benchmark(cards: int,
+                  seed: int,
+                  noise: float,
+                  blur: float,
+                  rotation: float,
+                  ocr_workers: int,
+                  layout: str | None) -> dict:
+    # Imported here: the scratch directory must be the working
+    # directory before anything opens data/volunteer.db
+    from src import ingest
+    from src.database import init_db, upsert_students
+    from src.drive_stub import start_stub_server
+    from src.ocr import extract_ocr_batch
+    from src.parse import parse_ocr_result
+    from src.sheet_reader import read_responses
+    from src.validate import validate_records
+
+    students = generate_dataset("synthetic", cards, seed, noise, blur, rotation)
+    truth = {s["email"]: s for s in students}
+
+    os.makedirs("data", exist_ok=True)
+    init_db()
+    server, url = start_stub_server("synthetic/cards")
+    ingest.DRIVE_DOWNLOAD_URL = url
+    timings = {}
+
+    try:
+        # -------- Sheet read --------
+        df, timings["sheet_read"] = _timed(
+            lambda: read_responses("synthetic/responses.csv")
+        )
+        rows = [row for _, row in df.iterrows()]
+
+        # -------- Download --------
+        paths, timings["download"] = _timed(
+            lambda: ingest.download_id_cards([row["ID Card"] for row in rows])
+        )
+        failed_downloads = sum(isinstance(p, Exception) for p in paths)
+        if failed_downloads:
+            raise RuntimeError(f"{failed_downloads} downloads failed")
+
+        # -------- OCR --------
+        results, timings["ocr"] = _timed(
+            lambda: extract_ocr_batch(paths, workers=ocr_workers, layout=layout)
+        )
+        ocr_failures = sum(isinstance(r, Exception) for r in results)
+        results = [
+            {"text": ""} if isinstance(r, Exception) else r for r in results
+        ]
+
+        # -------- Parse --------
+        parsed, timings["parse"] = _timed(
+            lambda: [parse_ocr_result(r) for r in results]
+        )
+
+        # -------- Validate --------
+        score_rows = [
+            {
+                "typed_name": row["Name"],
+                "ocr_name": ocr_data["name"],
+                "typed_phone": str(row["WhatsApp Number"]),
+                "ocr_phone": ocr_data["phone"],
+                "typed_year_of_study": int(row["Year of Study"]),
+                "computed_year_of_study": derived.get("computed_year"),
+            }
+            for row, (ocr_data, derived) in zip(rows, parsed)
+        ]
+        scores, timings["validate"] = _timed(lambda: validate_records(score_rows))
+
+        # -------- Upsert --------
+        records = [
+            ingest.build_student_record(row, image_path=path, ocr_result=result)
+            for row, path, result in zip(rows, paths, results)
+        ]
+        upsert_failures, timings["upsert"] = _timed(
+            lambda: upsert_students(records)
+        )
+    finally:
+        server.shutdown()
+
+    # -------- Accuracy --------
+    correct = {field: 0 for field in FIELDS}
+    all_correct = 0
+    for row, (ocr_data, _) in zip(rows, parsed):
+        expected = truth[row["Email address"]]
+        matches = [
+            _normalize(ocr_data.get(field)) == _normalize(expected[field])
+            for field in FIELDS
+        ]
+        for field, ok in zip(FIELDS, matches):
+            correct[field] += ok
+        all_correct += all(matches)
+
+    accuracy = {field: correct[field] / len(rows) for field in FIELDS}
+    accuracy["all_fields"] = all_correct / len(rows)
+
+    return {
+        "config": {
+            "cards": cards, "seed": seed, "noise": noise, "blur": blur,
+            "rotation": rotation, "ocr_workers": ocr_workers, "layout": layout,
+        },
+        "seconds": timings,
+        "throughput": {
+            stage: len(rows) / seconds if seconds else float("inf")
+            for stage, seconds in timings.items()
+        },
+        "accuracy": accuracy,
+        "mean_confidence": (
+            sum(s["overall_confidence"] for s in scores) / len(scores)
+        ),
+        "ocr_failures": ocr_failures,
+        "upsert_failures": len(upsert_failures),
+    }
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """Returns a description of every regression past the tolerances."""
+    problems = []
+
+    for stage, rate in baseline["throughput"].items():
+        if baseline["seconds"][stage] < MIN_STAGE_SECONDS:
+            continue
+        current = report["throughput"].get(stage, 0)
+        if current < rate * (1 - THROUGHPUT_TOLERANCE):
+            problems.append(
+                f"{stage} throughput {current:.1f}/s vs baseline {rate:.1f}/s"
+            )
+
+    for field, rate in baseline["accuracy"].items():
+        current = report["accuracy"].get(field, 0)
+        if current < rate - ACCURACY_TOLERANCE:
+            problems.append(
+                f"{field} accuracy {current:.1%} vs baseline {rate:.1%}"
+            )
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline")
+    parser.add_argument("--cards", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=8)
+    parser.add_argument("--blur", type=float, default=1)
+    parser.add_argument("--rotation", type=float, default=3)
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--layout", help="region-of-interest layout (src/layouts.py)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run as the baseline instead of comparing"
+    )
+    parser.add_argument("--json", dest="json_path", help="also write the report here")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            report = run_benchmark(
+                args.cards, args.seed, args.noise, args.blur, args.rotation,
+                args.ocr_workers, args.layout
+            )
+        finally:
+            os.chdir(cwd)
+
+    print(f"Cards                   : {args.cards}")
+    for stage, seconds in report["seconds"].items():
+        print(
+            f"{stage:<24}: {seconds:8.3f}s  "
+            f"{report['throughput'][stage]:10.1f} cards/s"
+        )
+    print()
+    for field, rate in report["accuracy"].items():
+        print(f"{field + ' accuracy':<24}: {rate:.1%}")
+    print(f"{'mean confidence':<24}: {report['mean_confidence']:.3f}")
+    print(f"{'OCR failures':<24}: {report['ocr_failures']}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2))
+
+    if args.cards and report["ocr_failures"] == args.cards:
+        print("\nOCR failed on every card; is Tesseract installed?")
+        sys.exit(1)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        sys.exit(2)
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["config"] != report["config"]:
+        print(
+            f"\nBaseline was recorded with different settings:\n"
+            f"  {baseline['config']}\nRe-run with those or --save-baseline."
+        )
+        sys.exit(2)
+
+    problems = compare(report, baseline)
+    if problems:
+        print("\nREGRESSION:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+
+    print("\nNo regression against baseline")
+
+
+if __name__ == "__main__":
+    main()
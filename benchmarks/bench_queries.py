@@ -0,0 +1,184 @@
+# benchmarks/bench_queries.py
+#
+# Latency of the query layer (src/query.py) and of the dashboard's data
+# load at event scale. For each database size, fills a database with
+# synthetic volunteers (scale_data.py), then calls every query and
+# allocation function repeatedly and reports latency percentiles.
+#
+# Databases are generated in a temporary directory unless --db-dir is
+# given, in which case they are kept there and reused by later runs.
+#
+# Usage:
+#   python -m benchmarks.bench_queries --sizes 10000 100000
+#   python -m benchmarks.bench_queries --sizes 1000000 --db-dir /tmp/scale --budget 30
+
+import time
+import random
+import tempfile
+import argparse
+from pathlib import Path
+
+from src import database
+from src.query import (
+    get_all_students,
+    get_unallocated,
+    get_unallocated_by_category,
+    get_candidates,
+    get_students_by_category,
+    count_students,
+    get_students,
+    get_students_page,
+    allocate_student,
+    unallocate_student,
+)
+from benchmarks.scale_data import CATEGORY_WEIGHTS, generate_students
+
+CATEGORIES = list(CATEGORY_WEIGHTS)
+
+
+def percentile(samples: list, q: float) -> float:
+    """Nearest-rank percentile of samples (0 < q <= 100)."""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def dashboard_load(selected: list, allocated: bool = True, unallocated: bool = True):
+    """What load_local_data in app.py does for one filter change."""
+    if not selected:
+        data = get_all_students()
+    else:
+        seen = {}
+        for category in selected:
+            for row in get_students_by_category(category):
+                seen[row["email"]] = row
+        data = list(seen.values())
+
+    if allocated and not unallocated:
+        return [row for row in data if row["allocated"] == 1]
+    if unallocated and not allocated:
+        return [row for row in data if row["allocated"] != 1]
+    return data
+
+
+def _toggle(emails: list, rng: random.Random):
+    # Allocate then unallocate, so repeated runs leave the data as it was
+    email = rng.choice(emails)
+    allocate_student(email, rng.choice(CATEGORIES))
+    unallocate_student(email)
+
+
+def cases(emails: list, rng: random.Random) -> dict:
+    """{name: callable} for everything benchmarked at each size."""
+    return {
+        "get_all_students": get_all_students,
+        "get_unallocated": get_unallocated,
+        "get_students_by_category": lambda: get_students_by_category(
+            rng.choice(CATEGORIES)
+        ),
+        "get_unallocated_by_category": lambda: get_unallocated_by_category(
+            rng.choice(CATEGORIES)
+        ),
+        "get_candidates": lambda: get_candidates(rng.choice(CATEGORIES)),
+        "dashboard: all": lambda: dashboard_load([]),
+        "dashboard: 2 cats, unalloc": lambda: dashboard_load(
+            rng.sample(CATEGORIES, 2), allocated=False
+        ),
+        "dashboard page (50)": lambda: get_students_page(
+            categories=rng.sample(CATEGORIES, 2), allocation="unallocated"
+        )[0],
+        "dashboard page, all filters": lambda: get_students_page(
+            categories=rng.sample(CATEGORIES, 2), match="all",
+            allocation="allocated", min_confidence=0.5,
+            event=rng.choice(CATEGORIES), sort="confidence", descending=True
+        )[0],
+        "count_students": lambda: count_students(
+            categories=rng.sample(CATEGORIES, 2), allocation="unallocated"
+        ),
+        "get_students (combined)": lambda: get_students(
+            categories=rng.sample(CATEGORIES, 2), allocation="unallocated"
+        ),
+        "allocate + unallocate": lambda: _toggle(emails, rng),
+    }
+
+
+def measure(fn, repeat: int, budget: float) -> tuple:
+    """
+    Calls fn up to repeat times (at least 3, stopping early once budget
+    seconds have been spent). Returns (latencies, rows of the last call).
+    """
+    latencies = []
+    result = None
+    spent = 0.0
+
+    while len(latencies) < repeat and (len(latencies) < 3 or spent < budget):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        spent += elapsed
+
+    return latencies, len(result) if isinstance(result, list) else None
+
+
+def bench_size(db_path: Path, students: int, seed: int, repeat: int,
+               budget: float, regenerate: bool):
+    if regenerate or not db_path.exists():
+        start = time.perf_counter()
+        generate_students(str(db_path), students, seed)
+        print(f"Generated {students} students in {time.perf_counter() - start:.1f}s")
+    else:
+        database.DB_PATH = db_path
+        print(f"Reusing {db_path}")
+
+    cur = database.get_connection().cursor()
+    emails = [row[0] for row in cur.execute("SELECT email FROM students;")]
+
+    print(
+        f"{'':<30}{'n':>4}{'rows':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    )
+    rng = random.Random(seed)
+    for name, fn in cases(emails, rng).items():
+        latencies, rows = measure(fn, repeat, budget)
+        ms = [s * 1000 for s in latencies]
+        print(
+            f"{name:<30}{len(ms):>4}{rows if rows is not None else '-':>10}"
+            f"{percentile(ms, 50):>10.2f}{percentile(ms, 95):>10.2f}"
+            f"{percentile(ms, 99):>10.2f}{max(ms):>10.2f}"
+        )
+
+    database.close_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the query layer at scale")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=50, help="calls per function")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=10,
+        help="stop repeating a function after this many seconds"
+    )
+    parser.add_argument("--db-dir", help="keep generated databases here and reuse them")
+    parser.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="rebuild databases in --db-dir even if they exist"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db_dir = Path(args.db_dir or scratch)
+        for size in args.sizes:
+            print(f"\n===== {size} students =====")
+            bench_size(
+                db_dir / f"scale_{size}_{args.seed}.db", size, args.seed,
+                args.repeat, args.budget, args.regenerate
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_validate.py
+#
+# Compares validate_record (one row at a time) with the batch
+# validate_records (what rescore_all runs) on synthetic rows, and
+# checks that they give identical scores.
+#
+# Usage:
+#   python -m benchmarks.bench_validate --rows 50000
+
+import sys
+import time
+import random
+import argparse
+
+from src.validate import validate_record, validate_records, SCORE_FIELDS
+
+FIRST_NAMES = [
+    "Aarav", "Ananya", "Rohan", "Priya", "Vikram", "Ishita", "Kabir",
+    "Meera", "Arjun", "Sneha", "Aditya", "Kavya", "Rahul", "Nandini",
+]
+LAST_NAMES = [
+    "Sharma", "Verma", "Gupta", "Iyer", "Nair", "Reddy", "Chatterjee",
+    "Mukherjee", "Singh", "Khan", "Das", "Joshi", "Menon", "Kapoor",
+]
+
+# Character confusions typical of Tesseract on ID cards
+OCR_CONFUSIONS = {
+    "o": "0", "l": "1", "i": "l", "m": "rn", "e": "c", "a": "o", "s": "5",
+}
+
+
+def ocr_noise(text: str, rate: float, rng: random.Random) -> str:
+    out = []
+    for ch in text:
+        r = rng.random()
+        if r < rate / 2 and ch.lower() in OCR_CONFUSIONS:
+            out.append(OCR_CONFUSIONS[ch.lower()])
+        elif r < rate * 0.7:
+            continue  # dropped character
+        elif r < rate:
+            out.append(ch + rng.choice("., '"))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def make_rows(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    rows = []
+
+    for _ in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone = f"{rng.randint(6, 9)}{rng.randint(0, 10**9 - 1):09d}"
+        year = rng.randint(1, 4)
+        quality = rng.random()
+
+        rows.append({
+            "typed_name": name,
+            "ocr_name": (
+                None if quality < 0.1
+                else ocr_noise(name.upper(), rate=quality * 0.3, rng=rng)
+            ),
+            "typed_phone": phone,
+            "ocr_phone": phone if quality > 0.3 else None,
+            "typed_year_of_study": year,
+            "computed_year_of_study": year if quality > 0.2 else year + 1,
+        })
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch validation")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+
+    start = time.perf_counter()
+    single = [validate_record(row) for row in rows]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = validate_records(rows)
+    batch_time = time.perf_counter() - start
+
+    print(f"Rows                    : {len(rows)}")
+    print(f"validate_record loop    : {single_time:.3f}s")
+    print(f"validate_records batch  : {batch_time:.3f}s")
+    print(f"Speedup                 : {single_time / batch_time:.1f}x\n")
+
+    ok = True
+    for field in SCORE_FIELDS:
+        mismatched = sum(a[field] != b[field] for a, b in zip(single, batch))
+        ok = ok and not mismatched
+
+        print(
+            f"{field:<20}: {mismatched} rows differ "
+            f"{'OK' if not mismatched else 'FAIL'}"
+        )
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/scale_data.py
+#
+# Fills a students database with synthetic volunteers at event scale
+# (10k - 1M rows) for benchmarking the query layer (bench_queries.py).
+# Distributions are meant to look like a real multi-college fest:
+#
+#   - 1-3 categories each, skewed towards the popular ones
+#   - ALLOCATED_FRACTION allocated, to one of their own categories
+#   - OCR quality from clean reads to cards OCR could not read at all
+#     (see make_rows in bench_validate.py), scored by rescore_all
+#
+# Rows are written straight into the tables (no download or OCR).
+#
+# Usage:
+#   python -m benchmarks.scale_data data/scale_100k.db --students 100000
+
+import random
+import argparse
+from pathlib import Path
+from datetime import date
+
+from src import database
+from src.database import get_connection, init_db, rescore_all, transaction
+from benchmarks.bench_validate import make_rows
+from benchmarks.synthetic_cards import COURSES
+
+# The dashboard's categories (app.py), with relative popularity
+CATEGORY_WEIGHTS = {
+    "Hackathon": 5,
+    "Gaming": 4,
+    "Quiz": 2,
+    "Treasure Hunt": 2,
+    "Miscellaneous": 1,
+}
+
+ALLOCATED_FRACTION = 0.3
+
+INSERT_BATCH = 10000
+
+
+def _pick_categories(rng: random.Random) -> list:
+    names = list(CATEGORY_WEIGHTS)
+    weights = list(CATEGORY_WEIGHTS.values())
+    wanted = rng.choices([1, 2, 3], weights=[5, 3, 2])[0]
+
+    picked = []
+    while len(picked) < wanted:
+        category = rng.choices(names, weights=weights)[0]
+        if category not in picked:
+            picked.append(category)
+    return picked
+
+
+def _students(count: int, seed: int):
+    rng = random.Random(seed)
+    this_year = date.today().year
+
+    for i, row in enumerate(make_rows(count, seed)):
+        course, length = rng.choice(COURSES)
+        year = row["typed_year_of_study"]
+        start = this_year - year
+        categories = _pick_categories(rng)
+        allocated = rng.random() < ALLOCATED_FRACTION
+        read = row["ocr_phone"] is not None
+
+        yield (
+            f"volunteer{i:07d}@example.com",
+            row["typed_name"],
+            course,
+            year,
+            row["typed_phone"],
+            ", ".join(categories),
+
+            row["ocr_name"],
+            # Unique, like real admission numbers
+            f"{course}{start % 100:02d}-{(start + length) % 100:02d}@{i:07d}"
+            if read else None,
+            row["ocr_phone"],
+
+            start if read else None,
+            start + length if read else None,
+            row["computed_year_of_study"] if read else None,
+
+            int(allocated),
+            rng.choice(categories) if allocated else None,
+        ), categories
+
+
+def generate_students(db_path: str, count: int, seed: int = 0) -> int:
+    """
+    Creates (or replaces) a database at db_path holding count synthetic
+    students, and leaves database.DB_PATH pointing at it.
+    Returns the number of students written.
+    """
+    path = Path(db_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+    database.DB_PATH = path
+    init_db()
+
+    batch = []
+
+    def flush():
+        with transaction() as conn:
+            conn.executemany("""
+                INSERT INTO students (
+                    email, typed_name, typed_course_code, typed_year_of_study,
+                    typed_phone, typed_categories,
+                    ocr_name, ocr_admission_no, ocr_phone,
+                    admission_year, batch_end_year, computed_year_of_study,
+                    allocated, allocated_event
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """, [student for student, _ in batch])
+            conn.executemany(
+                "INSERT INTO student_categories (category, email) VALUES (?, ?);",
+                [
+                    (category, student[0])
+                    for student, categories in batch
+                    for category in categories
+                ]
+            )
+        batch.clear()
+
+    for entry in _students(count, seed):
+        batch.append(entry)
+        if len(batch) >= INSERT_BATCH:
+            flush()
+    if batch:
+        flush()
+
+    rescore_all()
+    get_connection().execute("ANALYZE;")
+
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large students database")
+    parser.add_argument("db_path")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_students(args.db_path, args.students, args.seed)
+    print(f"Wrote {args.students} students to {args.db_path}")
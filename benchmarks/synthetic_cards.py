@@ -0,0 +1,195 @@
+# benchmarks/synthetic_cards.py
+#
+# Renders synthetic student ID cards with known contents: name,
+# admission number (ADMISSION_REGEX format) and phone number, placed to
+# match the "du_student_card" layout in src/layouts.py. Optional noise,
+# blur and rotation imitate phone photos. Also writes a matching form
+# export and the ground truth, so the cards can be pushed through the
+# real pipeline (see bench_pipeline.py).
+#
+# Usage:
+#   python -m benchmarks.synthetic_cards out/ --count 100 --noise 8 --blur 1 --rotation 3
+
+import re
+import csv
+import json
+import random
+import argparse
+from pathlib import Path
+from datetime import date
+
+import cv2
+import numpy as np
+
+from src.config import ADMISSION_REGEX, PHONE_REGEX
+from src.parse import compute_year_of_study, parse_admission_number
+from benchmarks.bench_validate import FIRST_NAMES, LAST_NAMES
+
+CARD_WIDTH = 1280
+CARD_HEIGHT = 800
+
+# (course code, programme length in years)
+COURSES = [("BTH", 4), ("BSC", 3), ("BCOM", 3), ("BA", 3), ("MSC", 2)]
+CATEGORIES = ["Quiz", "Gaming", "Hospitality", "Logistics", "Tech"]
+
+FONT = cv2.FONT_HERSHEY_DUPLEX
+
+
+def make_student(index: int, rng: random.Random, today_year: int) -> dict:
+    course, length = rng.choice(COURSES)
+    start = rng.randint(today_year - length, today_year - 1)
+    admission_no = (
+        f"{course}{start % 100:02d}-{(start + length) % 100:02d}"
+        f"@{rng.randint(100000, 999999)}"
+    )
+    phone = f"{rng.randint(6, 9)}{rng.randint(0, 10**9 - 1):09d}"
+
+    # Keep the generator honest if the formats in config change,
+    # and make sure the parser reads back what was printed
+    assert re.fullmatch(ADMISSION_REGEX, admission_no), admission_no
+    assert re.fullmatch(PHONE_REGEX, phone), phone
+    parsed = parse_admission_number(admission_no)
+    assert parsed and parsed["admission_no"] == admission_no, admission_no
+    assert parsed["admission_year"] % 100 == start % 100, admission_no
+
+    return {
+        "card_id": f"card{index:05d}",
+        "email": f"student{index:05d}@example.com",
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "course": course,
+        "year_of_study": compute_year_of_study(start),
+        "admission_no": admission_no,
+        "phone": phone,
+        "categories": ", ".join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+    }
+
+
+def _put(card, text: str, x: float, y: float, scale: float, thickness: int = 2):
+    # x and y are fractions of the card; y is the text baseline
+    cv2.putText(
+        card, text,
+        (int(x * CARD_WIDTH), int(y * CARD_HEIGHT)),
+        FONT, scale, (20, 20, 20), thickness, cv2.LINE_AA
+    )
+
+
+def render_card(student: dict,
+                rng: random.Random,
+                noise: float = 0,
+                blur: float = 0,
+                rotation: float = 0) -> np.ndarray:
+    """
+    Draws one card (BGR). noise is the std-dev of Gaussian pixel noise,
+    blur the sigma of a Gaussian blur and rotation the maximum tilt in
+    degrees (a random angle in [-rotation, rotation] is used).
+    """
+    card = np.full((CARD_HEIGHT, CARD_WIDTH, 3), (235, 240, 245), np.uint8)
+
+    # Header band and photo placeholder
+    card[:int(0.18 * CARD_HEIGHT)] = (110, 40, 30)
+    cv2.putText(
+        card, "UNIVERSITY OF DELHI",
+        (int(0.22 * CARD_WIDTH), int(0.12 * CARD_HEIGHT)),
+        FONT, 1.8, (255, 255, 255), 3, cv2.LINE_AA
+    )
+    photo = np.random.default_rng(rng.randint(0, 2**32 - 1)).integers(
+        60, 200, (5, 4, 3)
+    ).astype(np.uint8)
+    card[int(0.25 * CARD_HEIGHT):int(0.90 * CARD_HEIGHT),
+         int(0.03 * CARD_WIDTH):int(0.27 * CARD_WIDTH)] = cv2.resize(
+        photo,
+        (int(0.24 * CARD_WIDTH), int(0.90 * CARD_HEIGHT) - int(0.25 * CARD_HEIGHT)),
+        interpolation=cv2.INTER_CUBIC
+    )
+
+    # Field lines, inside the du_student_card boxes
+    _put(card, f"Student's Name: {student['name'].upper()}", 0.31, 0.41, 1.1)
+    _put(card, f"Admission No: {student['admission_no']}", 0.31, 0.54, 1.1)
+    _put(card, f"Course: {student['course']}", 0.31, 0.66, 1.0)
+    _put(card, f"Mobile: {student['phone']}", 0.31, 0.80, 1.1)
+
+    if rotation:
+        angle = rng.uniform(-rotation, rotation)
+        matrix = cv2.getRotationMatrix2D(
+            (CARD_WIDTH / 2, CARD_HEIGHT / 2), angle, 1.0
+        )
+        card = cv2.warpAffine(
+            card, matrix, (CARD_WIDTH, CARD_HEIGHT),
+            borderMode=cv2.BORDER_CONSTANT, borderValue=(200, 200, 200)
+        )
+
+    if blur:
+        card = cv2.GaussianBlur(card, (0, 0), blur)
+
+    if noise:
+        grain = np.random.default_rng(rng.randint(0, 2**32 - 1)).normal(
+            0, noise, card.shape
+        )
+        card = np.clip(card + grain, 0, 255).astype(np.uint8)
+
+    return card
+
+
+def generate_dataset(out_dir: str,
+                     count: int,
+                     seed: int = 0,
+                     noise: float = 0,
+                     blur: float = 0,
+                     rotation: float = 0) -> list:
+    """
+    Writes out_dir/cards/<card_id>.jpg, out_dir/responses.csv (a form
+    export linking each card as a Drive URL) and out_dir/truth.json.
+    Returns the students.
+    """
+    rng = random.Random(seed)
+    out = Path(out_dir)
+    (out / "cards").mkdir(parents=True, exist_ok=True)
+
+    students = [make_student(i, rng, date.today().year) for i in range(count)]
+
+    for student in students:
+        card = render_card(student, rng, noise, blur, rotation)
+        cv2.imwrite(
+            str(out / "cards" / f"{student['card_id']}.jpg"), card,
+            [cv2.IMWRITE_JPEG_QUALITY, 90]
+        )
+
+    with open(out / "responses.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "Timestamp", "Email address", "Name", "Course", "Year of Study",
+            "WhatsApp Number", "ID Card",
+            "What categories would you like to volunteer for",
+        ])
+        for i, s in enumerate(students):
+            writer.writerow([
+                f"1/1/2024 10:{i // 60 % 60:02d}:{i % 60:02d}",
+                s["email"], s["name"], s["course"], s["year_of_study"],
+                s["phone"],
+                f"https://drive.google.com/open?id={s['card_id']}",
+                s["categories"],
+            ])
+
+    (out / "truth.json").write_text(json.dumps(students, indent=2))
+    return students
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ID cards")
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0, help="pixel noise std-dev")
+    parser.add_argument("--blur", type=float, default=0, help="Gaussian blur sigma")
+    parser.add_argument("--rotation", type=float, default=0, help="max tilt, degrees")
+    args = parser.parse_args()
+
+    students = generate_dataset(
+        args.out_dir, args.count, args.seed,
+        args.noise, args.blur, args.rotation
+    )
+    print(f"Wrote {len(students)} cards to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
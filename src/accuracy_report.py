@@ -1,56 +1,239 @@
-from src.database import fetch_all_students_as_dict
-from src.validate import validate_record
-import statistics
-
-
-def generate_accuracy_report(threshold=0.8):
-    rows = fetch_all_students_as_dict()
-
-    if not rows:
+import json
+import math
+import sqlite3
+import argparse
+
+from src.database import get_connection, init_db, ocr_tier_counts
+from src.validate import stored_scores, SCORE_FIELDS
+
+# Scores live in [0, 1]; quantiles are read off a fixed histogram,
+# so they are accurate to 1 / HISTOGRAM_BINS whatever the row count.
+HISTOGRAM_BINS = 100
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+class ScoreStats:
+    """
+    Constant-memory running statistics for one score field:
+    count, mean, min, max and a fixed-width histogram.
+    """
+
+    def __init__(self, bins: int = HISTOGRAM_BINS):
+        self.count = 0
+        self.mean = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.histogram = [0] * bins
+
+    def add(self, value: float):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        bins = len(self.histogram)
+        index = min(max(int(value * bins), 0), bins - 1)
+        self.histogram[index] += 1
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+
+        bins = len(self.histogram)
+        target = q * self.count
+        seen = 0
+
+        for i, n in enumerate(self.histogram):
+            if n and seen + n >= target:
+                # Interpolate within the bin, clamped to the observed range
+                fraction = (target - seen) / n
+                value = (i + fraction) / bins
+                return min(max(value, self.min), self.max)
+            seen += n
+
+        return self.max
+
+    def to_dict(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "quantiles": {
+                f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES
+            },
+            "histogram": {
+                "bin_width": 1 / len(self.histogram),
+                "counts": self.histogram,
+            },
+        }
+
+
+class GroupStats:
+    """Running ScoreStats for every score field of one group of rows."""
+
+    def __init__(self):
+        self.fields = {field: ScoreStats() for field in SCORE_FIELDS}
+
+    def add(self, scores: dict):
+        for field, stats in self.fields.items():
+            stats.add(scores[field])
+
+    def to_dict(self) -> dict:
+        return {field: stats.to_dict() for field, stats in self.fields.items()}
+
+
+def collect_accuracy_stats(threshold: float = 0.8) -> dict:
+    """
+    Streams every student once and returns the report as a dict:
+    overall stats plus breakdowns by course code and admission year.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
+
+    overall = GroupStats()
+    by_course = {}
+    by_year = {}
+    low_confidence = 0
+
+    cur.execute("""
+        SELECT typed_course_code, admission_year,
+               typed_name, ocr_name, typed_phone, ocr_phone,
+               typed_year_of_study, computed_year_of_study,
+               name_score, phone_score, year_score, overall_confidence
+        FROM students;
+    """)
+
+    for row in cur:
+        scores = stored_scores(dict(row))
+
+        overall.add(scores)
+        by_course.setdefault(
+            row["typed_course_code"] or "unknown", GroupStats()
+        ).add(scores)
+        by_year.setdefault(
+            str(row["admission_year"] or "unknown"), GroupStats()
+        ).add(scores)
+
+        # Same rule as iter_low_confidence_emails: rows without a stored
+        # score (not yet rescored) are not counted as low-confidence
+        stored = row["overall_confidence"]
+        if stored is not None and stored < threshold:
+            low_confidence += 1
+
+    return {
+        "total_records": overall.fields["overall_confidence"].count,
+        "threshold": threshold,
+        "low_confidence_records": low_confidence,
+        "overall": overall.to_dict(),
+        "by_course_code": {k: g.to_dict() for k, g in sorted(by_course.items())},
+        "by_admission_year": {k: g.to_dict() for k, g in sorted(by_year.items())},
+        "ocr_tiers": ocr_tier_counts(),
+    }
+
+
+def iter_low_confidence_emails(threshold: float):
+    """Streams emails below the confidence threshold (indexed range scan)."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT email FROM students
+        WHERE overall_confidence < ?
+        ORDER BY overall_confidence;
+    """, (threshold,))
+
+    for (email,) in cur:
+        yield email
+
+
+def _print_breakdown(title: str, groups: dict):
+    print(f"{title}:")
+    for key, group in groups.items():
+        overall = group["overall_confidence"]
+        print(
+            f"  {key:<10} n={overall['count']:<6} "
+            f"name={group['name_score']['mean']:.3f} "
+            f"phone={group['phone_score']['mean']:.2%} "
+            f"year={group['year_score']['mean']:.2%} "
+            f"conf p50={overall['quantiles']['p50']:.3f}"
+        )
+    print()
+
+
+def generate_accuracy_report(threshold=0.8, json_path=None):
+    report = collect_accuracy_stats(threshold)
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not report["total_records"]:
         print("No data available.")
-        return
-
-    name_scores = []
-    phone_scores = []
-    year_scores = []
-    overall_scores = []
-    low_confidence = []
+        return report
 
-    for row in rows:
-        scores = validate_record(row)
+    overall = report["overall"]
+    name = overall["name_score"]
+    phone = overall["phone_score"]
+    year = overall["year_score"]
+    confidence = overall["overall_confidence"]
 
-        name_scores.append(scores["name_score"])
-        phone_scores.append(scores["phone_score"])
-        year_scores.append(scores["year_score"])
-        overall_scores.append(scores["overall_confidence"])
-
-        if scores["overall_confidence"] < threshold:
-            low_confidence.append(row["email"])
+    def quantile_line(stats):
+        q = stats["quantiles"]
+        return f"{q['p10']:.3f} / {q['p50']:.3f} / {q['p90']:.3f}"
 
     print("\n===== OCR ACCURACY REPORT =====\n")
 
-    print(f"Total records           : {len(rows)}\n")
+    print(f"Total records           : {report['total_records']}\n")
 
     print("Name similarity:")
-    print(f"  Mean                  : {statistics.mean(name_scores):.3f}")
-    print(f"  Min / Max             : {min(name_scores):.3f} / {max(name_scores):.3f}\n")
+    print(f"  Mean                  : {name['mean']:.3f}")
+    print(f"  Min / Max             : {name['min']:.3f} / {name['max']:.3f}")
+    print(f"  p10 / p50 / p90       : {quantile_line(name)}\n")
 
     print("Phone exact match:")
-    print(f"  Accuracy              : {sum(phone_scores)/len(phone_scores):.2%}\n")
+    print(f"  Accuracy              : {phone['mean']:.2%}\n")
 
     print("Year of study exact match:")
-    print(f"  Accuracy              : {sum(year_scores)/len(year_scores):.2%}\n")
+    print(f"  Accuracy              : {year['mean']:.2%}\n")
 
     print("Overall confidence:")
-    print(f"  Mean                  : {statistics.mean(overall_scores):.3f}")
-    print(f"  Min / Max             : {min(overall_scores):.3f} / {max(overall_scores):.3f}\n")
-
-    print(f"Low-confidence (<{threshold}) records:")
-    for email in low_confidence:
+    print(f"  Mean                  : {confidence['mean']:.3f}")
+    print(f"  Min / Max             : {confidence['min']:.3f} / {confidence['max']:.3f}")
+    print(f"  p10 / p50 / p90       : {quantile_line(confidence)}\n")
+
+    _print_breakdown("By course code", report["by_course_code"])
+    _print_breakdown("By admission year", report["by_admission_year"])
+
+    if report["ocr_tiers"]:
+        print("OCR passes needed (stored results):")
+        for tier, count in report["ocr_tiers"].items():
+            print(f"  {tier:<10} {count}")
+        print()
+
+    print(
+        f"Low-confidence (<{threshold}) records: "
+        f"{report['low_confidence_records']}"
+    )
+    for email in iter_low_confidence_emails(threshold):
         print(f"  - {email}")
 
     print("\n===============================\n")
 
+    return report
+
 
 if __name__ == "__main__":
-    generate_accuracy_report()
+    parser = argparse.ArgumentParser(description="OCR accuracy report")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument(
+        "--json",
+        dest="json_path",
+        help="also write the full report (with histograms) to this file"
+    )
+    args = parser.parse_args()
+
+    init_db()
+    generate_accuracy_report(args.threshold, args.json_path)
@@ -1,11 +1,105 @@
 # src/config.py
 
+import os
 from datetime import date
 
 AUGUST_CUTOFF_MONTH = 8
 AUGUST_CUTOFF_DAY = 1
 MAX_YEAR_CAP = 6
 
-ADMISSION_REGEX = r"[A-Z]{2,4}\d{2}-\d{2}@\d+"
+# parse_admission_number reads the course, start and end groups
+ADMISSION_REGEX = r"(?P<course>[A-Z]{2,4})(?P<start>\d{2})-(?P<end>\d{2})@\d+"
 PHONE_REGEX = r"(?:\+91[-\s]?)?([6-9]\d{9})"
 
+# Downloaded ID card images (content-addressed, see src/image_cache.py)
+RAW_IMAGE_DIR = "data/raw_images"
+IMAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024
+# Images unused for this many days are evicted too (None = no age limit)
+IMAGE_CACHE_MAX_AGE_DAYS = None
+
+
+# Image download stage (see src/downloader.py).
+# DRIVE_DOWNLOAD_URL can be pointed at a local stand-in (src/drive_stub.py).
+DRIVE_DOWNLOAD_URL = os.environ.get(
+    "DRIVE_DOWNLOAD_URL",
+    "https://drive.google.com/uc?export=download&id={file_id}"
+)
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_TIMEOUT = 15
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF_SECONDS = 0.5
+DOWNLOAD_MAX_REQUESTS_PER_HOST = 10  # per second
+# Larger downloads are rejected
+DOWNLOAD_MAX_BYTES = 20 * 1024 * 1024
+
+# Downloaded photos are decoded in memory and cached downscaled so their
+# long side fits IMAGE_MAX_DIMENSION, as grayscale JPEGs unless
+# IMAGE_STORE_GRAYSCALE is off (see compact_image in src/image_cache.py)
+IMAGE_MAX_DIMENSION = 2000
+IMAGE_STORE_GRAYSCALE = True
+IMAGE_JPEG_QUALITY = 90
+
+# OCR stage (see extract_ocr_batch and OcrPool in src/ocr.py)
+OCR_WORKERS = os.cpu_count() or 1
+OCR_TIMEOUT_SECONDS = 30
+
+# Ingestion job queue (see src/jobs.py): jobs are run in batches of
+# JOB_BATCH_SIZE; a failing job is retried after JOB_RETRY_BACKOFF_SECONDS,
+# doubling each time, up to JOB_MAX_ATTEMPTS attempts. Unfinished jobs
+# untouched for JOB_STUCK_SECONDS are reported as stuck.
+JOB_BATCH_SIZE = 200
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF_SECONDS = 60
+JOB_STUCK_SECONDS = 15 * 60
+
+# The dashboard runs ingestion in smaller batches, so its progress bar
+# moves steadily and Cancel takes effect quickly
+DASHBOARD_JOB_BATCH_SIZE = 25
+
+# Each ingest run writes its metrics here as JSON and Prometheus text
+# (see src/metrics.py); None disables the files
+METRICS_DIR = "data/metrics"
+
+# Rows per executemany call in upsert_students (src/database.py)
+UPSERT_BATCH_SIZE = 500
+
+# SQLite connection tuning (see get_connection in src/database.py)
+SQLITE_BUSY_TIMEOUT_SECONDS = 10
+SQLITE_CACHE_SIZE_KB = 16 * 1024
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_STATEMENT_CACHE_SIZE = 256
+
+# Weights of the overall OCR confidence (see src/validate.py).
+# Changing them triggers a rescore of stored rows on the next init_db().
+SCORE_WEIGHTS = {
+    "name": 0.4,
+    "phone": 0.3,
+    "year": 0.3,
+}
+
+# Last fetched copy of the response sheet, for conditional requests
+SHEET_CACHE_DIR = "data/sheet_cache"
+SHEET_FETCH_TIMEOUT = 30
+
+# OCR engine (see src/ocr_backends.py): "auto", "tesserocr" or "pytesseract"
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+OCR_LANGUAGE = "eng"
+# Also store Tesseract word boxes and confidences with the raw OCR text
+OCR_STORE_WORDS = False
+
+# Card layout for region-of-interest OCR (see src/layouts.py);
+# None OCRs the whole card
+OCR_LAYOUT = None
+
+# Tiered OCR (see OCR_TIERS in src/ocr.py): the first pass runs on a copy
+# downscaled to OCR_FAST_MAX_WIDTH pixels; the slower tiers only run while
+# one of OCR_REQUIRED_FIELDS fails to parse. OCR_ESCALATE = False runs a
+# single full-resolution pass.
+OCR_ESCALATE = True
+OCR_FAST_MAX_WIDTH = 1000
+OCR_REQUIRED_FIELDS = ("admission_no",)
+
+# Re-uploads of a card whose perceptual hash is within this many bits of
+# an already OCR'd image reuse its OCR output (see src/phash.py).
+# At most 3; None turns matching off.
+PHASH_MAX_DISTANCE = 2
@@ -1,13 +1,98 @@
 # src/database.py
 
+import os
+import json
 import sqlite3
+import threading
 from pathlib import Path
+from contextlib import contextmanager
+
+from src.config import (
+    UPSERT_BATCH_SIZE,
+    SQLITE_BUSY_TIMEOUT_SECONDS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_STATEMENT_CACHE_SIZE,
+    SCORE_WEIGHTS
+)
+from src.validate import validate_record, validate_records, SCORE_FIELDS
 
 DB_PATH = Path("data/volunteer.db")
 
-def get_connection():
-    """Create and return a SQLite connection."""
-    return sqlite3.connect(DB_PATH)
+_local = threading.local()
+
+# Dashboard sort orders: key -> SQL expression over students. NULLs map
+# to a value so keyset pagination can compare them (see
+# get_students_page in src/query.py); each expression is indexed
+# together with email, the tie-breaker.
+STUDENT_SORT_KEYS = {
+    "name": "IFNULL(ocr_name, '')",
+    "course": "IFNULL(ocr_admission_no, '')",
+    "year": "IFNULL(computed_year_of_study, 0)",
+    "phone": "IFNULL(ocr_phone, '')",
+    "allocated": "allocated",
+    "event": "IFNULL(allocated_event, '')",
+    "confidence": "IFNULL(overall_confidence, 0)",
+}
+
+
+def _open_connection(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        db_path,
+        timeout=SQLITE_BUSY_TIMEOUT_SECONDS,
+        cached_statements=SQLITE_STATEMENT_CACHE_SIZE
+    )
+
+    # WAL lets the dashboard read while an ingestion run writes
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB};")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Return this thread's SQLite connection, opening it on first use.
+
+    Connections are reused across calls, so callers must not close them.
+    Set row_factory on the cursor, not the connection.
+    """
+    key = (os.getpid(), str(DB_PATH))
+
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = _open_connection(DB_PATH)
+    return conn
+
+
+def close_connection():
+    """Close this thread's connections (e.g. at the end of a worker)."""
+    conns = getattr(_local, "conns", {})
+    while conns:
+        _, conn = conns.popitem()
+        conn.close()
+
+
+@contextmanager
+def transaction():
+    """
+    Yields this thread's connection and commits on success,
+    rolling back if the block raises.
+    """
+    conn = get_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
 def init_db():
     """Initialize the database and create tables if they don't exist."""
@@ -39,60 +124,463 @@ def init_db():
         allocated INTEGER DEFAULT 0,
         allocated_event TEXT,
 
+        -- Validation scores (src/validate.py), kept current by the upserts
+        name_score REAL,
+        phone_score REAL,
+        year_score REAL,
+        overall_confidence REAL,
+
+        -- Content hash of the ID card image (see ocr_results)
+        image_hash TEXT,
+
         -- Metadata
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
     """)
 
+    # Downloaded ID card images, keyed by Drive file ID.
+    # Files on disk are named by content hash, so re-uploads
+    # of the same image share one file.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS image_cache (
+        file_id TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        path TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        hits INTEGER DEFAULT 0,
+        fetched_at REAL NOT NULL,
+        last_used_at REAL NOT NULL
+    );
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_image_cache_last_used
+        ON image_cache(last_used_at);
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS image_cache_stats (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    );
+    """)
+
+    # Fingerprint of the last processed form row per email,
+    # used to skip unchanged submissions on refresh.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS submission_fingerprints (
+        email TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    # Normalized volunteer categories (one row per student per category),
+    # kept in sync with students.typed_categories by the upserts.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS student_categories (
+        category TEXT NOT NULL,
+        email TEXT NOT NULL,
+        PRIMARY KEY (category, email)
+    ) WITHOUT ROWID;
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_student_categories_email
+        ON student_categories(email);
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_students_allocated
+        ON students(allocated);
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_students_allocated_event
+        ON students(allocated_event);
+    """)
+
+    # Raw OCR output per image content hash, so parsing rules
+    # can be re-run without downloading or OCRing again
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ocr_results (
+        content_hash TEXT PRIMARY KEY,
+        raw_text TEXT NOT NULL,
+        fields_json TEXT,
+        words_json TEXT,
+        backend TEXT,
+        tier TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    # Perceptual hash per image content hash, for spotting re-uploads
+    # of the same card (see src/phash.py). The 64-bit hash is also split
+    # into four 16-bit bands, each indexed: any hash within 3 bits of
+    # another shares at least one band with it exactly.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS image_phashes (
+        content_hash TEXT PRIMARY KEY,
+        phash INTEGER NOT NULL,
+        band0 INTEGER NOT NULL,
+        band1 INTEGER NOT NULL,
+        band2 INTEGER NOT NULL,
+        band3 INTEGER NOT NULL,
+        -- Image whose OCR output was reused, and the operator's verdict:
+        -- 'pending', 'accepted' or 'rejected'
+        duplicate_of TEXT,
+        distance INTEGER,
+        match_status TEXT,
+        indexed_at REAL NOT NULL
+    );
+    """)
+
+    for band in range(4):
+        cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_image_phashes_band{band}
+            ON image_phashes(band{band});
+        """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_image_phashes_match_status
+        ON image_phashes(match_status);
+    """)
+
+    # Ingestion queue: one job per form submission recording how far
+    # it has got through the pipeline (see src/jobs.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_jobs (
+        email TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        row_json TEXT NOT NULL,
+        -- pending, downloaded, ocred, parsed, persisted or failed
+        stage TEXT NOT NULL,
+        -- Last stage completed; a failed job resumes from here
+        resume_stage TEXT NOT NULL,
+        image_path TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """)
+
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_ingest_jobs_stage
+        ON ingest_jobs(stage, updated_at);
+    """)
+
+    # Small key/value store for database-wide state
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS db_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """)
+
     conn.commit()
-    conn.close()
 
+    migrate_db()
 
-def insert_student(record: dict):
-    pass
+    # After the migrations: some sort keys use columns they add
+    for key, expression in STUDENT_SORT_KEYS.items():
+        cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_students_sort_{key}
+            ON students({expression}, email);
+        """)
+    conn.commit()
 
-def insert_or_update_student(form_data: dict,
-                             ocr_data: dict,
-                             derived_data: dict):
+    rescore_if_weights_changed()
+
+
+# --------------------------------------------------
+# Migrations
+# --------------------------------------------------
+# Each migration upgrades an existing data/volunteer.db by one
+# version; PRAGMA user_version records how far a file has got.
+
+def _migration_backfill_categories(cur):
+    """Fill student_categories from typed_categories of existing rows."""
+    cur.execute("SELECT email, typed_categories FROM students;")
+    _write_categories(cur, cur.fetchall())
+
+
+def _add_missing_columns(cur, table: str, columns: dict):
+    cur.execute(f"PRAGMA table_info({table});")
+    existing = {row[1] for row in cur.fetchall()}
+
+    for name, sql_type in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type};")
+
+
+def _migration_add_scores(cur):
+    """Add persisted validation scores and compute them for existing rows."""
+    _add_missing_columns(cur, "students", {
+        "name_score": "REAL",
+        "phone_score": "REAL",
+        "year_score": "REAL",
+        "overall_confidence": "REAL",
+    })
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_students_overall_confidence
+        ON students(overall_confidence);
+    """)
+    _rescore(cur)
+
+
+def _migration_add_image_hash(cur):
+    """Link students to their stored OCR output."""
+    _add_missing_columns(cur, "students", {"image_hash": "TEXT"})
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_students_image_hash
+        ON students(image_hash);
+    """)
+
+
+def _migration_add_ocr_fields(cur):
+    """Per-field text from region-of-interest OCR."""
+    _add_missing_columns(cur, "ocr_results", {"fields_json": "TEXT"})
+
+
+def _migration_add_ocr_tier(cur):
+    """Which tiered OCR pass produced each stored result."""
+    _add_missing_columns(cur, "ocr_results", {"tier": "TEXT"})
+
+
+def _migration_add_image_manifest(cur):
     """
-    Insert a new student or update existing one based on email.
+    Manifest of cached images: which students each one belongs to
+    and whether its OCR output is stored (see src/image_cache.py).
     """
+    cur.execute("""
+    CREATE VIEW IF NOT EXISTS image_manifest AS
+    SELECT c.content_hash,
+           c.file_id,
+           c.path,
+           c.size_bytes,
+           c.fetched_at,
+           c.last_used_at,
+           s.email,
+           o.content_hash IS NOT NULL AS has_ocr,
+           o.tier AS ocr_tier
+    FROM image_cache c
+    LEFT JOIN students s ON s.image_hash = c.content_hash
+    LEFT JOIN ocr_results o ON o.content_hash = c.content_hash;
+    """)
+
+
+MIGRATIONS = [
+    _migration_backfill_categories,
+    _migration_add_scores,
+    _migration_add_image_hash,
+    _migration_add_ocr_fields,
+    _migration_add_ocr_tier,
+    _migration_add_image_manifest,
+]
+
+
+def migrate_db():
+    """Apply any migrations the database file has not seen yet."""
     conn = get_connection()
     cur = conn.cursor()
 
+    version = cur.execute("PRAGMA user_version;").fetchone()[0]
+
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        with transaction():
+            migration(cur)
+            cur.execute(f"PRAGMA user_version = {number};")
+
+
+# --------------------------------------------------
+# Validation scores
+# --------------------------------------------------
+
+def _weights_signature() -> str:
+    return json.dumps(SCORE_WEIGHTS, sort_keys=True)
+
+
+def _rescore(cur):
+    """
+    Recompute the stored scores of every student.
+    """
     cur.execute("""
-    INSERT INTO students (
-        email,
-        typed_name,
-        typed_course_code,
-        typed_year_of_study,
-        typed_phone,
-        typed_categories,
+        SELECT email, typed_name, ocr_name, typed_phone, ocr_phone,
+               typed_year_of_study, computed_year_of_study
+        FROM students;
+    """)
+    columns = [d[0] for d in cur.description]
+    rows = [dict(zip(columns, r)) for r in cur.fetchall()]
+
+    updates = [
+        tuple(scores[field] for field in SCORE_FIELDS) + (row["email"],)
+        for row, scores in zip(rows, validate_records(rows))
+    ]
 
-        ocr_name,
-        ocr_admission_no,
-        ocr_phone,
+    cur.executemany("""
+        UPDATE students
+        SET name_score = ?,
+            phone_score = ?,
+            year_score = ?,
+            overall_confidence = ?
+        WHERE email = ?;
+    """, updates)
 
-        admission_year,
-        batch_end_year,
-        computed_year_of_study
+    cur.execute("""
+        INSERT INTO db_meta (key, value) VALUES ('score_weights', ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+    """, (_weights_signature(),))
+
+
+def rescore_all():
+    """
+    Recompute every stored score, e.g. after changing a scoring rule
+    in src/validate.py.
+    """
+    conn = get_connection()
+    with transaction():
+        _rescore(conn.cursor())
+
+
+def rescore_if_weights_changed() -> bool:
+    """
+    Recompute stored scores if SCORE_WEIGHTS differ from the
+    weights they were computed with. Returns True if it rescored.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT value FROM db_meta WHERE key = 'score_weights';")
+    row = cur.fetchone()
+    if row and row[0] == _weights_signature():
+        return False
+
+    # Component scores do not depend on the weights,
+    # so only the weighted sum needs recomputing
+    with transaction():
+        cur.execute("""
+            UPDATE students
+            SET overall_confidence =
+                ? * name_score + ? * phone_score + ? * year_score
+            WHERE name_score IS NOT NULL;
+        """, (
+            SCORE_WEIGHTS["name"],
+            SCORE_WEIGHTS["phone"],
+            SCORE_WEIGHTS["year"]
+        ))
+        cur.execute("""
+            INSERT INTO db_meta (key, value) VALUES ('score_weights', ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+        """, (_weights_signature(),))
+    return True
+
+
+def split_categories(categories_csv: str | None) -> list:
+    """
+    Splits a Google Forms checkbox answer ("Quiz, Treasure Hunt")
+    into its individual categories.
+    """
+    if not categories_csv:
+        return []
+
+    categories = []
+    for part in str(categories_csv).split(","):
+        part = part.strip()
+        if part and part not in categories:
+            categories.append(part)
+    return categories
+
+
+def _write_categories(cur, rows):
+    """
+    Replaces the student_categories entries for each
+    (email, categories_csv) in rows.
+    """
+    rows = list(rows)
+
+    cur.executemany(
+        "DELETE FROM student_categories WHERE email = ?;",
+        [(email,) for email, _ in rows]
     )
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ON CONFLICT(email) DO UPDATE SET
-        typed_name = excluded.typed_name,
-        typed_course_code = excluded.typed_course_code,
-        typed_year_of_study = excluded.typed_year_of_study,
-        typed_phone = excluded.typed_phone,
-        typed_categories = excluded.typed_categories,
-
-        ocr_name = excluded.ocr_name,
-        ocr_admission_no = excluded.ocr_admission_no,
-        ocr_phone = excluded.ocr_phone,
-
-        admission_year = excluded.admission_year,
-        batch_end_year = excluded.batch_end_year,
-        computed_year_of_study = excluded.computed_year_of_study;
-    """, (
+    cur.executemany(
+        "INSERT OR IGNORE INTO student_categories (category, email) VALUES (?, ?);",
+        [
+            (category, email)
+            for email, categories_csv in rows
+            for category in split_categories(categories_csv)
+        ]
+    )
+
+
+def insert_student(record: dict):
+    pass
+
+UPSERT_STUDENT_SQL = """
+INSERT INTO students (
+    email,
+    typed_name,
+    typed_course_code,
+    typed_year_of_study,
+    typed_phone,
+    typed_categories,
+
+    ocr_name,
+    ocr_admission_no,
+    ocr_phone,
+
+    admission_year,
+    batch_end_year,
+    computed_year_of_study,
+
+    name_score,
+    phone_score,
+    year_score,
+    overall_confidence,
+
+    image_hash
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(email) DO UPDATE SET
+    typed_name = excluded.typed_name,
+    typed_course_code = excluded.typed_course_code,
+    typed_year_of_study = excluded.typed_year_of_study,
+    typed_phone = excluded.typed_phone,
+    typed_categories = excluded.typed_categories,
+
+    ocr_name = excluded.ocr_name,
+    ocr_admission_no = excluded.ocr_admission_no,
+    ocr_phone = excluded.ocr_phone,
+
+    admission_year = excluded.admission_year,
+    batch_end_year = excluded.batch_end_year,
+    computed_year_of_study = excluded.computed_year_of_study,
+
+    name_score = excluded.name_score,
+    phone_score = excluded.phone_score,
+    year_score = excluded.year_score,
+    overall_confidence = excluded.overall_confidence,
+
+    image_hash = excluded.image_hash;
+"""
+
+
+def _student_params(form_data: dict,
+                    ocr_data: dict,
+                    derived_data: dict) -> tuple:
+    scores = validate_record({
+        "typed_name": form_data["name"],
+        "ocr_name": ocr_data.get("name"),
+        "typed_phone": form_data["phone"],
+        "ocr_phone": ocr_data.get("phone"),
+        "typed_year_of_study": form_data["year_of_study"],
+        "computed_year_of_study": derived_data.get("computed_year"),
+    })
+
+    return (
         form_data["email"],
         form_data["name"],
         form_data["course_code"],
@@ -106,13 +594,216 @@ def insert_or_update_student(form_data: dict,
 
         derived_data.get("admission_year"),
         derived_data.get("batch_end_year"),
-        derived_data.get("computed_year")
-    ))
+        derived_data.get("computed_year"),
+
+        *(scores[field] for field in SCORE_FIELDS),
+
+        ocr_data.get("image_hash")
+    )
+
+
+def insert_or_update_student(form_data: dict,
+                             ocr_data: dict,
+                             derived_data: dict):
+    """
+    Insert a new student or update existing one based on email.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        UPSERT_STUDENT_SQL,
+        _student_params(form_data, ocr_data, derived_data)
+    )
+    _write_categories(
+        cur, [(form_data["email"], form_data["categories_csv"])]
+    )
+
+    conn.commit()
+
+
+def upsert_students(records, batch_size: int = UPSERT_BATCH_SIZE) -> list:
+    """
+    Bulk insert_or_update_student over an iterable of
+    (form_data, ocr_data, derived_data) tuples, in a single transaction.
+
+    Each batch is written with executemany. If a batch fails (e.g. a
+    duplicate ocr_admission_no), it is replayed row by row so that only
+    the offending rows are skipped.
+
+    Returns a list of (email, error) for the rows that were not written.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    failures = []
+
+    def write_batch(batch):
+        cur.execute("SAVEPOINT upsert_batch;")
+        try:
+            cur.executemany(UPSERT_STUDENT_SQL, [p for _, p, _ in batch])
+            _write_categories(cur, [(email, c) for email, _, c in batch])
+            cur.execute("RELEASE upsert_batch;")
+            return
+        except sqlite3.Error:
+            cur.execute("ROLLBACK TO upsert_batch;")
+            cur.execute("RELEASE upsert_batch;")
+
+        for email, params, categories_csv in batch:
+            cur.execute("SAVEPOINT upsert_row;")
+            try:
+                cur.execute(UPSERT_STUDENT_SQL, params)
+                _write_categories(cur, [(email, categories_csv)])
+            except sqlite3.Error as e:
+                cur.execute("ROLLBACK TO upsert_row;")
+                failures.append((email, e))
+            cur.execute("RELEASE upsert_row;")
+
+    cur.execute("BEGIN;")
+    try:
+        batch = []
+        for form_data, ocr_data, derived_data in records:
+            try:
+                params = _student_params(form_data, ocr_data, derived_data)
+            except (KeyError, TypeError) as e:
+                failures.append((form_data.get("email"), e))
+                continue
+
+            batch.append(
+                (form_data["email"], params, form_data["categories_csv"])
+            )
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                batch = []
+
+        if batch:
+            write_batch(batch)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return failures
+
+
+def get_fingerprints() -> dict:
+    """
+    Returns {email: fingerprint} for every processed submission.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT email, fingerprint FROM submission_fingerprints;")
+    fingerprints = dict(cur.fetchall())
+
+    return fingerprints
+
+def save_fingerprints(fingerprints: dict):
+    """
+    Stores the fingerprint of each {email: fingerprint}.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.executemany("""
+    INSERT INTO submission_fingerprints (email, fingerprint)
+    VALUES (?, ?)
+    ON CONFLICT(email) DO UPDATE SET
+        fingerprint = excluded.fingerprint,
+        updated_at = CURRENT_TIMESTAMP;
+    """, list(fingerprints.items()))
 
     conn.commit()
-    conn.close()
 
 
+def get_ocr_results(content_hashes) -> dict:
+    """
+    Returns {content_hash: {"text", "fields"}} for the hashes
+    that have stored OCR output.
+    """
+    cur = get_connection().cursor()
+
+    results = {}
+    hashes = list(content_hashes)
+    # Stay under SQLite's bound-parameter limit
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        cur.execute(f"""
+            SELECT content_hash, raw_text, fields_json FROM ocr_results
+            WHERE content_hash IN ({", ".join("?" * len(chunk))});
+        """, chunk)
+
+        for content_hash, raw_text, fields_json in cur.fetchall():
+            results[content_hash] = {
+                "text": raw_text,
+                "fields": json.loads(fields_json) if fields_json else None,
+            }
+
+    return results
+
+
+def get_image_owners(content_hashes) -> dict:
+    """
+    Returns {content_hash: set of emails} of the students whose
+    ID card image has each hash.
+    """
+    cur = get_connection().cursor()
+
+    owners = {}
+    hashes = list(content_hashes)
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        cur.execute(f"""
+            SELECT image_hash, email FROM students
+            WHERE image_hash IN ({", ".join("?" * len(chunk))});
+        """, chunk)
+
+        for image_hash, email in cur.fetchall():
+            owners.setdefault(image_hash, set()).add(email)
+
+    return owners
+
+
+def save_ocr_results(results: dict):
+    """
+    Stores {content_hash: extract_ocr result dict} as raw OCR output.
+    """
+    with transaction() as conn:
+        conn.executemany("""
+        INSERT INTO ocr_results (
+            content_hash, raw_text, fields_json, words_json, backend, tier
+        )
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET
+            raw_text = excluded.raw_text,
+            fields_json = excluded.fields_json,
+            words_json = excluded.words_json,
+            backend = excluded.backend,
+            tier = excluded.tier,
+            created_at = CURRENT_TIMESTAMP;
+        """, [
+            (
+                content_hash,
+                result["text"],
+                json.dumps(result["fields"]) if result.get("fields") else None,
+                json.dumps(result["words"]) if result.get("words") else None,
+                result.get("backend"),
+                result.get("tier")
+            )
+            for content_hash, result in results.items()
+        ])
+
+
+def ocr_tier_counts() -> dict:
+    """Returns {tier: stored OCR results} (see OCR_TIERS in src/ocr.py)."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT COALESCE(tier, 'unknown'), COUNT(*) FROM ocr_results
+        GROUP BY 1 ORDER BY 2 DESC;
+    """)
+    return dict(cur.fetchall())
+
 
 def update_allocation(admission_no: str, event: str):
     pass
@@ -124,16 +815,33 @@ def fetch_all_students():
     cur.execute("SELECT * FROM students;")
     rows = cur.fetchall()
 
-    conn.close()
     return rows
 
 def fetch_all_students_as_dict():
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("SELECT * FROM students;")
     rows = [dict(row) for row in cur.fetchall()]
 
-    conn.close()
     return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate the volunteer database")
+    parser.add_argument(
+        "--rescore",
+        action="store_true",
+        help="recompute all stored validation scores"
+    )
+    args = parser.parse_args()
+
+    init_db()
+    print(f"{DB_PATH} migrated to schema version {len(MIGRATIONS)}")
+
+    if args.rescore:
+        rescore_all()
+        print("Validation scores recomputed")
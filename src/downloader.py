@@ -0,0 +1,146 @@
+# src/downloader.py
+
+import time
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import (
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_TIMEOUT,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_BACKOFF_SECONDS,
+    DOWNLOAD_MAX_REQUESTS_PER_HOST,
+    DOWNLOAD_MAX_BYTES
+)
+
+# Status codes worth retrying; anything else is a permanent failure
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLarge(requests.RequestException):
+    """A response body over the download size limit (not retried)."""
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests so each host sees at most `rate` per second.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host: str):
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Downloader:
+    """
+    Shared HTTP client for the download stage: one pooled session,
+    retries with exponential backoff and a per-host rate limit.
+    Safe to use from several threads.
+    """
+
+    def __init__(self,
+                 pool_size: int = DOWNLOAD_WORKERS,
+                 timeout: float = DOWNLOAD_TIMEOUT,
+                 retries: int = DOWNLOAD_RETRIES,
+                 backoff: float = DOWNLOAD_BACKOFF_SECONDS,
+                 max_per_host: float = DOWNLOAD_MAX_REQUESTS_PER_HOST,
+                 max_bytes: int = DOWNLOAD_MAX_BYTES):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = HostRateLimiter(max_per_host)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt)
+
+    def _read_body(self, r) -> bytes:
+        # Refuse oversized files before reading them where possible
+        length = r.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            raise ResponseTooLarge(
+                f"{r.url}: {int(length)} bytes exceeds {self.max_bytes}"
+            )
+
+        chunks = []
+        size = 0
+        for chunk in r.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ResponseTooLarge(
+                    f"{r.url}: more than {self.max_bytes} bytes"
+                )
+            chunks.append(chunk)
+
+        return b"".join(chunks)
+
+    def fetch(self, url: str) -> bytes:
+        """
+        GETs a URL and returns the body, retrying transient failures.
+        The body is streamed and may be at most max_bytes long.
+        """
+        host = urlparse(url).netloc
+
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(host)
+
+            try:
+                with self.session.get(url, timeout=self.timeout, stream=True) as r:
+                    if r.status_code in RETRY_STATUS and attempt < self.retries:
+                        delay = self._retry_delay(attempt, r)
+                    else:
+                        r.raise_for_status()
+                        return self._read_body(r)
+            except (requests.ConnectionError,
+                    requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError):
+                # The connection can also drop mid-body while streaming
+                if attempt == self.retries:
+                    raise
+                delay = self._retry_delay(attempt)
+
+            time.sleep(delay)
+
+    def close(self):
+        self.session.close()
+
+
+_default_downloader = None
+
+
+def get_default_downloader() -> Downloader:
+    global _default_downloader
+    if _default_downloader is None:
+        _default_downloader = Downloader()
+    return _default_downloader
@@ -0,0 +1,90 @@
+# src/drive_stub.py
+#
+# Minimal local stand-in for Google Drive's download endpoint.
+# Serves files from a directory as /uc?export=download&id=<file_id>,
+# where <file_id> is the file name without extension.
+#
+# Usage:
+#   python -m src.drive_stub path/to/images --port 8765
+#   DRIVE_DOWNLOAD_URL="http://127.0.0.1:8765/uc?export=download&id={file_id}" \
+#       python -m src.ingest
+
+import argparse
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def make_handler(image_dir: Path, fail_first: int = 0):
+    """
+    Builds a request handler serving files from image_dir.
+    The first `fail_first` requests for each ID answer 503,
+    to exercise the client's retry path.
+    """
+    failures = {}
+    lock = threading.Lock()
+
+    class DriveStubHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            file_id = query.get("id", [""])[0]
+
+            matches = list(image_dir.glob(f"{file_id}.*")) if file_id else []
+            if not matches:
+                self.send_error(404, "File not found")
+                return
+
+            with lock:
+                seen = failures.get(file_id, 0)
+                failures[file_id] = seen + 1
+            if seen < fail_first:
+                self.send_error(503, "Try again")
+                return
+
+            body = matches[0].read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return DriveStubHandler
+
+
+def start_stub_server(image_dir: str,
+                      port: int = 0,
+                      fail_first: int = 0):
+    """
+    Starts the stub server on a background thread.
+    Returns (server, download_url_template); call server.shutdown() when done.
+    """
+    handler = make_handler(Path(image_dir), fail_first)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    url = f"http://{host}:{port}/uc?export=download&id={{file_id}}"
+    return server, url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Drive download stand-in")
+    parser.add_argument("image_dir")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.image_dir, args.port, args.fail_first)
+    print(f"DRIVE_DOWNLOAD_URL={url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,426 @@
+# src/image_cache.py
+
+import io
+import os
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from src.config import (
+    RAW_IMAGE_DIR,
+    IMAGE_CACHE_MAX_BYTES,
+    IMAGE_CACHE_MAX_AGE_DAYS,
+    IMAGE_MAX_DIMENSION,
+    IMAGE_STORE_GRAYSCALE,
+    IMAGE_JPEG_QUALITY
+)
+from src.database import get_connection, init_db, transaction
+
+# gc leaves unreferenced files younger than this alone,
+# as an ingest may be writing them right now
+GC_GRACE_SECONDS = 3600
+
+# cv2.imdecode flags by (grayscale, reduction); the reduced modes let
+# the JPEG decoder produce a 1/2, 1/4 or 1/8 scale image directly
+DECODE_FLAGS = {
+    (False, 1): cv2.IMREAD_COLOR,
+    (False, 2): cv2.IMREAD_REDUCED_COLOR_2,
+    (False, 4): cv2.IMREAD_REDUCED_COLOR_4,
+    (False, 8): cv2.IMREAD_REDUCED_COLOR_8,
+    (True, 1): cv2.IMREAD_GRAYSCALE,
+    (True, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (True, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (True, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def _bump_stat(cur, key: str, amount: int = 1):
+    cur.execute("""
+        INSERT INTO image_cache_stats (key, value)
+        VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+    """, (key, amount))
+
+
+def path_hash(path: str) -> str:
+    """Content hash of a cached image (files are named by it)."""
+    return Path(path).stem
+
+
+def image_path(content_hash: str) -> str:
+    """
+    Where a cached image lives: sharded into 256 subdirectories by the
+    first two hex digits of its hash, to keep directories small.
+    """
+    return os.path.join(RAW_IMAGE_DIR, content_hash[:2], f"{content_hash}.jpg")
+
+
+def compact_image(content: bytes,
+                  max_dimension: int = IMAGE_MAX_DIMENSION,
+                  grayscale: bool = IMAGE_STORE_GRAYSCALE) -> bytes:
+    """
+    Decodes downloaded image bytes in memory and returns what to keep on
+    disk: the bytes unchanged if the photo already fits max_dimension and
+    grayscale is off, otherwise a downscaled (grayscale) JPEG.
+    Raises ValueError for anything that is not an image.
+    """
+    try:
+        # Only the header is parsed here
+        with Image.open(io.BytesIO(content)) as header:
+            width, height = header.size
+    except Exception:
+        raise ValueError("Downloaded file is not a supported image") from None
+
+    long_side = max(width, height)
+    if long_side <= max_dimension and not grayscale:
+        return content
+
+    reduction = 1
+    while reduction < 8 and long_side / (reduction * 2) >= max_dimension:
+        reduction *= 2
+
+    image = cv2.imdecode(
+        np.frombuffer(content, dtype=np.uint8),
+        DECODE_FLAGS[(grayscale, reduction)]
+    )
+    if image is None:
+        raise ValueError("Could not decode downloaded image")
+
+    height, width = image.shape[:2]
+    scale = max_dimension / max(height, width)
+    if scale < 1:
+        image = cv2.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+
+    ok, encoded = cv2.imencode(
+        ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, IMAGE_JPEG_QUALITY]
+    )
+    if not ok:
+        raise ValueError("Could not encode downloaded image")
+    return encoded.tobytes()
+
+
+def lookup(file_id: str) -> str | None:
+    """
+    Returns the local path of a cached image for a Drive file ID,
+    or None if it has not been fetched (or its file has gone missing).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute(
+        "SELECT path FROM image_cache WHERE file_id = ?",
+        (file_id,)
+    )
+    row = cur.fetchone()
+
+    if row and os.path.exists(row[0]):
+        cur.execute("""
+            UPDATE image_cache
+            SET hits = hits + 1,
+                last_used_at = ?
+            WHERE file_id = ?
+        """, (time.time(), file_id))
+        _bump_stat(cur, "hits")
+        conn.commit()
+        return row[0]
+
+    if row:
+        # Stale entry: file was deleted behind our back
+        cur.execute("DELETE FROM image_cache WHERE file_id = ?", (file_id,))
+
+    _bump_stat(cur, "misses")
+    conn.commit()
+    return None
+
+
+def store(file_id: str, content: bytes) -> str:
+    """
+    Stores downloaded image bytes (as compact_image output) under the
+    content hash of the download and records the file ID -> file
+    mapping. Returns the local path.
+
+    Does not evict: downloads run concurrently, so the caller evicts
+    once a batch is stored, keeping that batch's paths.
+    """
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    path = image_path(content_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if os.path.exists(path):
+        size = os.path.getsize(path)
+    else:
+        data = compact_image(content)
+        size = len(data)
+
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    now = time.time()
+
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""
+        INSERT INTO image_cache (
+            file_id, content_hash, path, size_bytes,
+            fetched_at, last_used_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(file_id) DO UPDATE SET
+            content_hash = excluded.content_hash,
+            path = excluded.path,
+            size_bytes = excluded.size_bytes,
+            fetched_at = excluded.fetched_at,
+            last_used_at = excluded.last_used_at
+    """, (file_id, content_hash, path, size, now, now))
+
+    conn.commit()
+
+    return path
+
+
+def _drop_entry(cur, file_id: str, path: str) -> bool:
+    """
+    Removes one cache entry, and its file once no other file ID
+    refers to it. Returns True if the file was deleted.
+    """
+    cur.execute("DELETE FROM image_cache WHERE file_id = ?", (file_id,))
+
+    cur.execute("SELECT 1 FROM image_cache WHERE path = ? LIMIT 1", (path,))
+    if cur.fetchone() is not None:
+        return False
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def evict(max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+          keep_paths=(),
+          max_age_days: float | None = IMAGE_CACHE_MAX_AGE_DAYS) -> int:
+    """
+    Evicts entries unused for more than max_age_days, then
+    least-recently-used entries until the files on disk fit in
+    max_bytes. A file is only deleted once no file ID refers to it,
+    and files in keep_paths (still needed by a running ingest) never are.
+    Returns the number of entries evicted.
+    """
+    keep_paths = set(keep_paths)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
+
+    evicted = 0
+
+    if max_age_days is not None:
+        cur.execute("""
+            SELECT file_id, path FROM image_cache
+            WHERE last_used_at < ?
+        """, (time.time() - max_age_days * 86400,))
+
+        for entry in cur.fetchall():
+            if entry["path"] in keep_paths:
+                continue
+            _drop_entry(cur, entry["file_id"], entry["path"])
+            evicted += 1
+
+    cur.execute("""
+        SELECT COALESCE(SUM(size_bytes), 0)
+        FROM (SELECT DISTINCT path, size_bytes FROM image_cache)
+    """)
+    total = cur.fetchone()[0]
+
+    if total > max_bytes:
+        cur.execute("""
+            SELECT file_id, path, size_bytes
+            FROM image_cache
+            ORDER BY last_used_at ASC
+        """)
+        candidates = cur.fetchall()
+
+        for entry in candidates:
+            if total <= max_bytes:
+                break
+            if entry["path"] in keep_paths:
+                continue
+
+            if _drop_entry(cur, entry["file_id"], entry["path"]):
+                total -= entry["size_bytes"]
+            evicted += 1
+
+    if evicted:
+        _bump_stat(cur, "evictions", evicted)
+    conn.commit()
+    return evicted
+
+
+def gc(dry_run: bool = False) -> dict:
+    """
+    Reconciles the image directory with the cache table: drops entries
+    whose file is gone, deletes files no entry refers to (including
+    interrupted .part writes) and applies the size and age quotas.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT file_id, path FROM image_cache")
+    entries = cur.fetchall()
+
+    missing = [file_id for file_id, path in entries if not os.path.exists(path)]
+    referenced = {
+        os.path.normpath(path) for _, path in entries if os.path.exists(path)
+    }
+
+    orphans = []
+    freed = 0
+    cutoff = time.time() - GC_GRACE_SECONDS
+
+    for root, _, files in os.walk(RAW_IMAGE_DIR):
+        for name in files:
+            path = os.path.normpath(os.path.join(root, name))
+            if path in referenced:
+                continue
+
+            stat = os.stat(path)
+            if stat.st_mtime > cutoff:
+                continue
+            orphans.append(path)
+            freed += stat.st_size
+
+    evicted = 0
+    if not dry_run:
+        with transaction():
+            cur.executemany(
+                "DELETE FROM image_cache WHERE file_id = ?",
+                [(file_id,) for file_id in missing]
+            )
+
+        for path in orphans:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        evicted = evict()
+
+        # Empty shard directories
+        for root, dirs, files in os.walk(RAW_IMAGE_DIR, topdown=False):
+            if root != RAW_IMAGE_DIR and not dirs and not files:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+
+    return {
+        "missing_entries": len(missing),
+        "orphaned_files": len(orphans),
+        "orphaned_bytes": freed,
+        "evicted": evicted,
+    }
+
+
+def manifest(email: str | None = None) -> list:
+    """
+    Rows of the image_manifest view (cached image -> students ->
+    stored OCR output), optionally for one student.
+    """
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    if email:
+        cur.execute(
+            "SELECT * FROM image_manifest WHERE email = ?",
+            (email,)
+        )
+    else:
+        cur.execute("SELECT * FROM image_manifest ORDER BY last_used_at DESC")
+
+    return [dict(row) for row in cur.fetchall()]
+
+
+def cache_stats() -> dict:
+    """
+    Returns hit/miss counters and current cache size.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("SELECT key, value FROM image_cache_stats")
+    counters = dict(cur.fetchall())
+
+    cur.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT path)
+        FROM image_cache
+    """)
+    entries, files = cur.fetchone()
+
+    cur.execute("""
+        SELECT COALESCE(SUM(size_bytes), 0)
+        FROM (SELECT DISTINCT path, size_bytes FROM image_cache)
+    """)
+    total_bytes = cur.fetchone()[0]
+
+    hits = counters.get("hits", 0)
+    misses = counters.get("misses", 0)
+    lookups = hits + misses
+
+    return {
+        "entries": entries,
+        "files": files,
+        "total_bytes": total_bytes,
+        "max_bytes": IMAGE_CACHE_MAX_BYTES,
+        "max_age_days": IMAGE_CACHE_MAX_AGE_DAYS,
+        "hits": hits,
+        "misses": misses,
+        "evictions": counters.get("evictions", 0),
+        "hit_rate": hits / lookups if lookups else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Downloaded ID card images")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="stats",
+        choices=["stats", "gc", "manifest"],
+        help="show cache stats (default), garbage-collect, or list images"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="gc: only report what would be removed"
+    )
+    parser.add_argument("--email", help="manifest: only this student's images")
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.command == "gc":
+        for key, value in gc(args.dry_run).items():
+            print(f"{key:<16}: {value}")
+    elif args.command == "manifest":
+        for row in manifest(args.email):
+            print(
+                f"{row['content_hash'][:12]}  {row['file_id']:<36} "
+                f"{row['email'] or '-':<32} ocr={row['ocr_tier'] or '-'}  "
+                f"{row['path']}"
+            )
+    else:
+        for key, value in cache_stats().items():
+            print(f"{key:<12}: {value}")
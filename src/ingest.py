@@ -1,19 +1,51 @@
 # src/ingest.py
 
 import os
-import uuid
-import requests
-
-from src.sheet_reader import read_responses
-from src.ocr import extract_text
-from src.parse import (
-    parse_admission_number,
-    parse_phone_number,
-    parse_name
-)
-from src.database import init_db, insert_or_update_student
+import time
+import argparse
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 
-from datetime import date
+from src.sheet_reader import fetch_responses
+from src.ocr import OcrPool, extract_ocr, extract_ocr_batch
+from src.parse import parse_ocr_result, compute_year_of_study
+from src.database import (
+    init_db,
+    insert_or_update_student,
+    upsert_students,
+    get_fingerprints,
+    save_fingerprints,
+    get_ocr_results,
+    get_image_owners,
+    save_ocr_results
+)
+from src import image_cache
+from src import metrics
+from src.phash import match_near_duplicates, record_matches
+from src.jobs import (
+    enqueue,
+    runnable_jobs,
+    count_runnable,
+    advance,
+    fail,
+    job_summary,
+    print_summary
+)
+from src.downloader import (
+    Downloader,
+    ResponseTooLarge,
+    RETRY_STATUS,
+    get_default_downloader
+)
+from src.config import (
+    DRIVE_DOWNLOAD_URL,
+    DOWNLOAD_WORKERS,
+    OCR_WORKERS,
+    OCR_TIMEOUT_SECONDS,
+    JOB_BATCH_SIZE,
+    METRICS_DIR
+)
 
 import re
 
@@ -29,41 +61,85 @@ def extract_drive_file_id(url: str) -> str | None:
     return None
 
 
-def download_id_card(url: str) -> str:
+def download_id_card(url: str, downloader: Downloader | None = None) -> str:
     file_id = extract_drive_file_id(url)
     if not file_id:
         raise ValueError("Could not extract Drive file ID")
 
-    download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-
-    os.makedirs("data/raw_images", exist_ok=True)
-    filename = f"{uuid.uuid4().hex}.jpg"
-    path = os.path.join("data/raw_images", filename)
+    cached_path = image_cache.lookup(file_id)
+    if cached_path:
+        metrics.inc("image_cache_hits")
+        return cached_path
 
-    r = requests.get(download_url, timeout=15)
-    r.raise_for_status()
+    download_url = DRIVE_DOWNLOAD_URL.format(file_id=file_id)
 
-    with open(path, "wb") as f:
-        f.write(r.content)
+    downloader = downloader or get_default_downloader()
+    with metrics.timed("download_seconds"):
+        content = downloader.fetch(download_url)
+    metrics.inc("bytes_downloaded", len(content))
 
-    return path
+    return image_cache.store(file_id, content)
 
 
-def compute_year_of_study(admission_year: int) -> int:
+def download_id_cards(urls: list,
+                      workers: int = DOWNLOAD_WORKERS,
+                      on_done=None) -> list:
     """
-    Computes year of study using Aug 1 cutoff.
+    Downloads ID cards concurrently over one pooled session.
+    Returns one entry per URL, in order: the local path,
+    or the exception raised for that URL.
+    on_done, if given, is called (from a worker thread) after each URL.
     """
-    today = date.today()
-    cutoff = date(admission_year, 8, 1)
+    downloader = Downloader(pool_size=workers)
+
+    def fetch_one(url):
+        try:
+            return download_id_card(url, downloader)
+        except Exception as e:
+            return e
+        finally:
+            if on_done:
+                on_done()
 
-    delta_years = (today - cutoff).days / 365.25
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fetch_one, urls))
+    finally:
+        downloader.close()
 
-    year = int(delta_years) + 1
-    return min(max(year, 1), 6)
 
-def process_single_submission(row):
+# Form columns that affect what ends up in the students table.
+# A change in any of them makes the row count as edited.
+FINGERPRINT_COLUMNS = [
+    "Timestamp",
+    "Email address",
+    "Name",
+    "Course",
+    "Year of Study",
+    "WhatsApp Number",
+    "ID Card",
+    "What categories would you like to volunteer for",
+]
+
+
+def compute_row_fingerprint(row) -> str:
     """
-    Processes one Google Form response row.
+    Stable hash of the form fields of one response row.
+    """
+    values = [str(row.get(col, "")) for col in FINGERPRINT_COLUMNS]
+    return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def build_student_record(row,
+                         image_path: str | None = None,
+                         ocr_result: dict | Exception | None = None) -> tuple:
+    """
+    Turns one Google Form response row into the
+    (form_data, ocr_data, derived_data) tuple stored in the database.
+    image_path and ocr_result can be passed when the download or
+    OCR stage already ran for this row (see run_pipeline). ocr_result
+    may be the exception that stopped the card being downloaded or
+    OCR'd; the row is then stored with NULL OCR fields.
     """
 
     # -------- Typed (authoritative) data --------
@@ -77,48 +153,492 @@ def process_single_submission(row):
     }
 
     # -------- ID card OCR --------
-    image_url = row["ID Card"]
-    image_path = download_id_card(image_url)
+    if image_path is None and not isinstance(ocr_result, Exception):
+        image_path = download_id_card(row["ID Card"])
 
     try:
-        raw_text = extract_text(image_path)
+        if isinstance(ocr_result, Exception):
+            raise ocr_result
+        if ocr_result is None:
+            ocr_result = extract_ocr(image_path, timeout=OCR_TIMEOUT_SECONDS)
     except Exception as e:
         print(f"OCR failed for {form_data['email']}: {e}")
-        raw_text = ""
+        ocr_result = {"text": ""}
 
+    # -------- Parsed + derived --------
+    ocr_data, derived_data = parse_ocr_result(ocr_result)
+    ocr_data["image_hash"] = image_cache.path_hash(image_path) if image_path else None
+
+    return form_data, ocr_data, derived_data
+
+
+def process_single_submission(row):
+    """
+    Processes one Google Form response row.
+    """
+    insert_or_update_student(*build_student_record(row))
+
+
+class IngestCancelled(Exception):
+    """Raised inside run_pipeline once its cancel event is set."""
+
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise IngestCancelled()
+
+
+def _stage_counter(report, stage: str, total: int):
+    """Reports the start of a stage; returns an on_done callback for its items."""
+    done = itertools.count(1)
+    report(stage, 0, total)
+    return lambda: report(stage, next(done), total)
+
+
+def _is_permanent(error: Exception) -> bool:
+    """
+    Whether a card error would recur on every retry: not an image,
+    over the size limit, or refused by Drive (4xx, e.g. not shared).
+    """
+    if isinstance(error, (ValueError, ResponseTooLarge)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code not in RETRY_STATUS
+
+
+def _download_stage(jobs: list, workers: int, report) -> dict:
+    """
+    Downloads the cards of jobs that have no image yet (or whose cached
+    image has since been evicted). Returns {email: error}.
+    """
+    todo = [
+        job for job in jobs
+        if job["stage"] == "pending"
+        or not (job["image_path"] and os.path.exists(job["image_path"]))
+    ]
+    with metrics.timed("stage_seconds", stage="download"):
+        image_paths = download_id_cards(
+            [str(job["row"].get("ID Card", "")) for job in todo],
+            workers=workers,
+            on_done=_stage_counter(report, "download", len(todo))
+        )
+
+    failures = {}
+    done = []
+    for job, image_path in zip(todo, image_paths):
+        if isinstance(image_path, Exception):
+            failures[job["email"]] = image_path
+        else:
+            job["image_path"] = image_path
+            done.append(job)
+
+    # Once per batch, after every download has been stored, so no
+    # card of this batch is evicted before it is OCR'd
+    image_cache.evict(keep_paths={
+        job["image_path"] for job in jobs
+        if job["email"] not in failures and job["image_path"]
+    })
+
+    advance(done, "downloaded")
+    return failures
+
+
+def _normalize_name(name: str | None) -> str:
+    return " ".join((name or "").split()).casefold()
+
+
+def _normalize_phone(phone: str | None) -> str:
+    return re.sub(r"\D", "", phone or "")[-10:]
+
+
+def _can_reuse_ocr(job: dict, owners: set, ocr_result: dict) -> bool:
+    """
+    Whether the OCR output of another image (whose students are owners)
+    may stand in for this job's card: the same submitter re-uploading,
+    or a card whose parsed name and phone match what this row typed.
+    Cards printed from one template can hash as near duplicates.
+    """
+    if job["email"] in owners:
+        return True
+
+    try:
+        ocr_data, _ = parse_ocr_result(ocr_result)
+    except Exception:
+        return False
+
+    row = job["row"]
+    return (
+        bool(ocr_data.get("name")) and bool(ocr_data.get("phone"))
+        and _normalize_name(ocr_data["name"]) == _normalize_name(row.get("Name"))
+        and _normalize_phone(ocr_data["phone"])
+        == _normalize_phone(str(row.get("WhatsApp Number", "")))
+    )
 
-    admission_info = parse_admission_number(raw_text) or {}
-    ocr_data = {
-        "name": parse_name(raw_text),
-        "admission_no": admission_info.get("admission_no"),
-        "phone": parse_phone_number(raw_text)
-    }
 
-    # -------- Derived --------
-    derived_data = {}
-    if admission_info:
-        derived_data = {
-            "admission_year": admission_info["admission_year"],
-            "batch_end_year": admission_info["batch_end_year"],
-            "computed_year": compute_year_of_study(
-                admission_info["admission_year"]
+def _ocr_stage(jobs: list,
+               workers: int,
+               reocr: bool,
+               report,
+               ocr_pool: OcrPool) -> tuple:
+    """
+    OCRs the downloaded cards of jobs. Returns ({path: extract_ocr
+    dict}, {email: error}); jobs whose card could not be OCR'd stay
+    at downloaded.
+    """
+    # Identical images share one path, so each is OCR'd once
+    downloaded = list(dict.fromkeys(job["image_path"] for job in jobs))
+    hashes = {p: image_cache.path_hash(p) for p in downloaded}
+
+    stored = {} if reocr else get_ocr_results(hashes.values())
+    ocr_by_path = {p: stored[hashes[p]] for p in downloaded if hashes[p] in stored}
+
+    to_ocr = [p for p in downloaded if hashes[p] not in stored]
+
+    # Re-uploads of an already OCR'd card reuse its output, flagged for
+    # review (python -m src.phash), but never for a different student
+    if not reocr:
+        matches = match_near_duplicates(
+            {hashes[p]: p for p in to_ocr}, workers=workers
+        )
+        originals = get_ocr_results(m for m, _ in matches.values())
+        owners = get_image_owners(m for m, _ in matches.values())
+
+        jobs_by_path = {}
+        for job in jobs:
+            jobs_by_path.setdefault(job["image_path"], []).append(job)
+
+        reused = {}
+        for p in to_ocr:
+            if hashes[p] not in matches:
+                continue
+            m, _ = matches[hashes[p]]
+            if m in originals and all(
+                _can_reuse_ocr(job, owners.get(m, set()), originals[m])
+                for job in jobs_by_path[p]
+            ):
+                reused[hashes[p]] = dict(originals[m], tier="duplicate")
+
+        save_ocr_results(reused)
+        record_matches({h: matches[h] for h in reused})
+        for p in to_ocr:
+            if hashes[p] in reused:
+                ocr_by_path[p] = reused[hashes[p]]
+        to_ocr = [p for p in to_ocr if hashes[p] not in reused]
+        metrics.inc("ocr_reused", len(reused))
+
+    results = extract_ocr_batch(
+        to_ocr,
+        on_done=_stage_counter(report, "ocr", len(to_ocr)),
+        pool=ocr_pool
+    )
+
+    save_ocr_results({
+        hashes[p]: r for p, r in zip(to_ocr, results)
+        if not isinstance(r, Exception)
+    })
+    ocr_by_path.update(zip(to_ocr, results))
+
+    for r in results:
+        if isinstance(r, Exception):
+            metrics.inc("ocr_failures")
+        else:
+            metrics.inc("ocr_tier", tier=r["tier"])
+            metrics.observe("ocr_seconds", r["seconds"])
+
+    failures = {}
+    done = []
+    for job in jobs:
+        result = ocr_by_path[job["image_path"]]
+        if isinstance(result, Exception):
+            failures[job["email"]] = result
+        else:
+            done.append(job)
+
+    advance(done, "ocred")
+    return ocr_by_path, failures
+
+
+def _count_card_errors(errors: dict, stage: str):
+    for email, error in errors.items():
+        if _is_permanent(error):
+            print(f"Unusable ID card for {email}: {error}")
+            metrics.inc("cards_unusable", stage=stage)
+        else:
+            metrics.inc("rows_failed", stage=stage)
+
+
+def _run_jobs(jobs: list,
+              download_workers: int,
+              ocr_workers: int,
+              reocr: bool,
+              report,
+              cancel,
+              ocr_pool: OcrPool):
+    """
+    Takes one batch of jobs from their current stage to persisted.
+    Stops between stages (raising IngestCancelled) if cancel is set;
+    each job then resumes from the last stage it completed.
+
+    A card that cannot be downloaded or OCR'd does not hold back the
+    typed row, which is saved with NULL OCR fields. If the error is
+    transient the job still fails, so the card is retried after its
+    backoff; permanent errors (see _is_permanent) are not retried.
+    """
+    download_errors = _download_stage(jobs, download_workers, report)
+    _count_card_errors(download_errors, "download")
+
+    # Jobs failed at the end of the batch (or when it is cancelled)
+    failures = dict(download_errors)
+
+    try:
+        _check_cancel(cancel)
+        with metrics.timed("stage_seconds", stage="ocr"):
+            ocr_by_path, ocr_errors = _ocr_stage(
+                [job for job in jobs if job["email"] not in download_errors],
+                ocr_workers, reocr, report, ocr_pool
             )
-        }
+        _count_card_errors(ocr_errors, "ocr")
+        failures.update(ocr_errors)
+        card_errors = {**download_errors, **ocr_errors}
+
+        _check_cancel(cancel)
+        report("parse", 0, len(jobs))
+        records = []
+        parsed = []
+        with metrics.timed("stage_seconds", stage="parse"):
+            for job in jobs:
+                email = job["email"]
+                try:
+                    if email in download_errors:
+                        record = build_student_record(
+                            job["row"], ocr_result=download_errors[email]
+                        )
+                    else:
+                        record = build_student_record(
+                            job["row"],
+                            image_path=job["image_path"],
+                            ocr_result=card_errors.get(email)
+                            or ocr_by_path[job["image_path"]]
+                        )
+                except Exception as e:
+                    failures[email] = e
+                    metrics.inc("rows_failed", stage="parse")
+                    continue
+                records.append(record)
+                parsed.append(job)
+
+        for _, ocr_data, _ in records:
+            for field in ("name", "admission_no", "phone"):
+                if not ocr_data.get(field):
+                    metrics.inc("parse_misses", field=field)
+        # Jobs whose card is to be retried keep their stage
+        advance([job for job in parsed if job["email"] not in failures], "parsed")
+
+        # -------- Persist (single transaction per batch) --------
+        _check_cancel(cancel)
+        report("persist", 0, len(records))
+        with metrics.timed("stage_seconds", stage="persist"):
+            for email, e in upsert_students(records):
+                failures[email] = e
+                metrics.inc("rows_failed", stage="persist")
+
+        # Saved without OCR for good: nothing left to retry
+        for job in parsed:
+            error = card_errors.get(job["email"])
+            if error is not None and failures.get(job["email"]) is error:
+                if _is_permanent(error):
+                    del failures[job["email"]]
 
-    # -------- Persist --------
-    insert_or_update_student(form_data, ocr_data, derived_data)
+        persisted = [job for job in parsed if job["email"] not in failures]
+        advance(persisted, "persisted")
+        save_fingerprints({job["email"]: job["fingerprint"] for job in persisted})
+        metrics.inc("rows_processed", len(persisted))
 
-def run_pipeline():
+    finally:
+        for email, e in failures.items():
+            print(f"Failed for {email}: {e}")
+        fail(failures)
+
+
+def run_pipeline(full: bool = False,
+                 download_workers: int = DOWNLOAD_WORKERS,
+                 ocr_workers: int = OCR_WORKERS,
+                 source: str | None = None,
+                 reocr: bool = False,
+                 resume_only: bool = False,
+                 batch_size: int = JOB_BATCH_SIZE,
+                 metrics_dir: str | None = METRICS_DIR,
+                 progress=None,
+                 cancel=None):
+    """
+    Ingests new and edited form responses.
+    With full=True every row is reprocessed.
+    source overrides the sheet URL (or points at a local export).
+    Images with stored OCR output are not OCR'd again unless reocr is set.
+
+    Rows are queued as jobs (src/jobs.py) and run in batches, so an
+    interrupted run resumes where it stopped and failed rows are
+    retried. resume_only skips the sheet and just works the queue.
+
+    Run metrics are printed and, with metrics_dir, written there as
+    ingest_metrics.json and ingest_metrics.prom.
+
+    progress, if given, is called with an event dict whenever a stage
+    starts and as each row finishes downloading or OCR, possibly from
+    worker threads:
+
+      {"stage": ..., "done": rows finished (persisted or failed),
+       "total": rows to process, "failed": ..., "stage_done": ...,
+       "stage_total": ...}
+
+    stage is one of sheet_fetch, download, ocr, parse, persist, and
+    finally done or cancelled. cancel is a threading.Event: once set,
+    the run stops at the next stage boundary, and unfinished rows stay
+    queued for the next run.
+    """
     init_db()
+    run = metrics.get_metrics()
+    run.reset()
 
-    df = read_responses()
+    skipped = 0
+    total = 0
 
-    for _, row in df.iterrows():
-        try:
-            process_single_submission(row)
-        except Exception as e:
-            print(f"Failed for {row.get('Email address')}: {e}")
+    def report(stage, stage_done=0, stage_total=0):
+        if progress is None:
+            return
+        failed = sum(run.counters_by_label("rows_failed", "stage").values())
+        progress({
+            "stage": stage,
+            "done": int(run.counter("rows_processed") + failed),
+            "total": total,
+            "failed": int(failed),
+            "stage_done": stage_done,
+            "stage_total": stage_total,
+        })
+
+    report("sheet_fetch")
+
+    if not resume_only:
+        with metrics.timed("stage_seconds", stage="sheet_fetch"):
+            df, changed = fetch_responses(source)
+        if not changed:
+            print("Sheet unchanged since last fetch")
+
+        # A volunteer may submit more than once; the last response wins
+        df = df.drop_duplicates(subset="Email address", keep="last")
+
+        fingerprints = {} if full else get_fingerprints()
+
+        submissions = []
+        for _, row in df.iterrows():
+            email = row.get("Email address")
+            fingerprint = compute_row_fingerprint(row)
+
+            if fingerprints.get(email) == fingerprint:
+                skipped += 1
+                continue
+
+            submissions.append((
+                email,
+                fingerprint,
+                {col: row.get(col) for col in FINGERPRINT_COLUMNS}
+            ))
+
+        enqueue(submissions, reset=full)
+        metrics.inc("rows_skipped", skipped)
+
+    # Jobs touched from here on are not picked up again in this run
+    started = time.time()
+    total = count_runnable(started)
+    cancelled = False
+
+    # One set of OCR workers (and engines) serves every batch of the run
+    try:
+        with OcrPool(ocr_workers) as ocr_pool:
+            while True:
+                _check_cancel(cancel)
+                jobs = runnable_jobs(batch_size, before=started)
+                if not jobs:
+                    break
+                _run_jobs(
+                    jobs, download_workers, ocr_workers, reocr, report,
+                    cancel, ocr_pool
+                )
+    except IngestCancelled:
+        cancelled = True
+        print("Cancelled; unfinished rows will resume on the next run")
+
+    failed = sum(run.counters_by_label("rows_failed", "stage").values())
+    print(
+        f"Processed {run.counter('rows_processed'):g} rows, "
+        f"skipped {skipped} unchanged"
+        + (f", {failed:g} failed" if failed else "")
+    )
+    run.print_summary()
+
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        run.write_json(os.path.join(metrics_dir, "ingest_metrics.json"))
+        run.write_prometheus(os.path.join(metrics_dir, "ingest_metrics.prom"))
+
+    summary = job_summary()
+    if summary["failing"] or summary["stuck"]:
+        print_summary(summary)
+
+    report("cancelled" if cancelled else "done")
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Ingest Google Form responses")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="reprocess every row, ignoring stored fingerprints"
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DOWNLOAD_WORKERS,
+        help="number of concurrent image downloads"
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=OCR_WORKERS,
+        help="number of OCR worker processes"
+    )
+    parser.add_argument(
+        "--sheet",
+        help="sheet export URL or local .csv/.xlsx file (default: sheet_config)"
+    )
+    parser.add_argument(
+        "--reocr",
+        action="store_true",
+        help="OCR images again even if their OCR output is stored"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="only work through queued and failed jobs, without reading the sheet"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["cpu", "memory"],
+        help="profile this run with cProfile or tracemalloc "
+             "(main process only; OCR workers are separate processes)"
+    )
+    parser.add_argument(
+        "--profile-out",
+        help="also save the raw profile (cProfile stats or tracemalloc snapshot)"
+    )
+    args = parser.parse_args()
+
+    with metrics.profiled(args.profile, args.profile_out):
+        run_pipeline(
+            full=args.full,
+            download_workers=args.download_workers,
+            ocr_workers=args.ocr_workers,
+            source=args.sheet,
+            reocr=args.reocr,
+            resume_only=args.resume
+        )
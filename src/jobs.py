@@ -0,0 +1,240 @@
+# src/jobs.py
+#
+# Durable ingestion queue. Every form submission that needs processing
+# gets a job (keyed by email, like students) recording the last pipeline
+# stage it completed:
+#
+#   pending -> downloaded -> ocred -> parsed -> persisted
+#
+# so a refresh that crashes or is interrupted resumes where it stopped.
+# A job that fails moves to "failed" and is retried from its last
+# completed stage (resume_stage) once its backoff has passed.
+#
+# Usage:
+#   python -m src.jobs            # summary of unfinished, failing and stuck jobs
+#   python -m src.jobs --retry    # retry failed jobs now, resetting attempts
+
+import json
+import time
+import sqlite3
+import argparse
+
+from src.config import (
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_STUCK_SECONDS
+)
+from src.database import get_connection, init_db, transaction
+
+STAGES = ["pending", "downloaded", "ocred", "parsed", "persisted"]
+FAILED = "failed"
+
+
+def enqueue(submissions: list, reset: bool = False) -> int:
+    """
+    Adds (email, fingerprint, row) jobs at stage pending. A job already
+    queued for the same fingerprint keeps its progress unless reset is
+    set or it has been persisted. Returns the number of jobs queued.
+    """
+    now = time.time()
+    with transaction() as conn:
+        conn.executemany("""
+        INSERT INTO ingest_jobs (
+            email, fingerprint, row_json, stage, resume_stage,
+            created_at, updated_at
+        )
+        VALUES (?, ?, ?, 'pending', 'pending', ?, ?)
+        ON CONFLICT(email) DO UPDATE SET
+            fingerprint = excluded.fingerprint,
+            row_json = excluded.row_json,
+            stage = 'pending',
+            resume_stage = 'pending',
+            image_path = NULL,
+            attempts = 0,
+            last_error = NULL,
+            next_attempt_at = 0,
+            updated_at = excluded.updated_at
+        WHERE ?
+           OR ingest_jobs.fingerprint != excluded.fingerprint
+           OR ingest_jobs.stage = 'persisted';
+        """, [
+            (email, fingerprint, json.dumps(row), now, now, reset)
+            for email, fingerprint, row in submissions
+        ])
+
+    return len(submissions)
+
+
+# Jobs runnable_jobs may return
+RUNNABLE_SQL = """
+    updated_at <= ?
+    AND stage != 'persisted'
+    AND (stage != 'failed' OR (attempts < ? AND next_attempt_at <= ?))
+"""
+
+
+def runnable_jobs(limit: int, before: float) -> list:
+    """
+    Up to limit unfinished jobs not touched since before (so each job
+    runs at most once per refresh), skipping failed jobs that are still
+    backing off or out of attempts. Each job's stage is the one to
+    resume from.
+    """
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    cur.execute(f"""
+        SELECT email, fingerprint, row_json, resume_stage, image_path, attempts
+        FROM ingest_jobs
+        WHERE {RUNNABLE_SQL}
+        ORDER BY created_at
+        LIMIT ?;
+    """, (before, JOB_MAX_ATTEMPTS, time.time(), limit))
+
+    return [
+        {
+            "email": row["email"],
+            "fingerprint": row["fingerprint"],
+            "row": json.loads(row["row_json"]),
+            "stage": row["resume_stage"],
+            "image_path": row["image_path"],
+            "attempts": row["attempts"],
+        }
+        for row in cur.fetchall()
+    ]
+
+
+def count_runnable(before: float) -> int:
+    """How many jobs runnable_jobs would hand out in total."""
+    cur = get_connection().cursor()
+    cur.execute(
+        f"SELECT COUNT(*) FROM ingest_jobs WHERE {RUNNABLE_SQL};",
+        (before, JOB_MAX_ATTEMPTS, time.time())
+    )
+    return cur.fetchone()[0]
+
+
+def advance(jobs: list, stage: str):
+    """Records that jobs (dicts from runnable_jobs) completed a stage."""
+    now = time.time()
+    with transaction() as conn:
+        conn.executemany("""
+        UPDATE ingest_jobs
+        SET stage = ?, resume_stage = ?, image_path = ?, updated_at = ?
+        WHERE email = ?;
+        """, [
+            (stage, stage, job["image_path"], now, job["email"])
+            for job in jobs
+        ])
+
+    for job in jobs:
+        job["stage"] = stage
+
+
+def fail(failures: dict):
+    """
+    Marks {email: error} jobs failed. Each is retried after
+    JOB_RETRY_BACKOFF_SECONDS, doubled for every earlier attempt.
+    """
+    now = time.time()
+    with transaction() as conn:
+        conn.executemany("""
+        UPDATE ingest_jobs
+        SET stage = 'failed',
+            attempts = attempts + 1,
+            last_error = ?,
+            next_attempt_at = ? + ? * (1 << MIN(attempts, 16)),
+            updated_at = ?
+        WHERE email = ?;
+        """, [
+            (str(error) or type(error).__name__, now,
+             JOB_RETRY_BACKOFF_SECONDS, now, email)
+            for email, error in failures.items()
+        ])
+
+
+def retry_failed() -> int:
+    """Makes every failed job runnable again with a fresh attempt count."""
+    with transaction() as conn:
+        cur = conn.execute("""
+            UPDATE ingest_jobs SET attempts = 0, next_attempt_at = 0
+            WHERE stage = 'failed';
+        """)
+        return cur.rowcount
+
+
+def job_summary(stuck_after: float = JOB_STUCK_SECONDS) -> dict:
+    """
+    Counts per stage, plus the failed jobs (with their last error)
+    and the unfinished jobs nothing has touched for stuck_after seconds.
+    """
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    cur.execute("SELECT stage, COUNT(*) FROM ingest_jobs GROUP BY stage;")
+    counts = {stage: 0 for stage in STAGES + [FAILED]}
+    counts.update((row[0], row[1]) for row in cur.fetchall())
+
+    cur.execute("""
+        SELECT email, resume_stage, attempts, last_error, next_attempt_at
+        FROM ingest_jobs
+        WHERE stage = 'failed'
+        ORDER BY attempts DESC, updated_at;
+    """)
+    failing = [dict(row) for row in cur.fetchall()]
+    for job in failing:
+        job["exhausted"] = job["attempts"] >= JOB_MAX_ATTEMPTS
+
+    cur.execute("""
+        SELECT email, stage, updated_at
+        FROM ingest_jobs
+        WHERE stage NOT IN ('persisted', 'failed') AND updated_at < ?
+        ORDER BY updated_at;
+    """, (time.time() - stuck_after,))
+    stuck = [dict(row) for row in cur.fetchall()]
+
+    return {"counts": counts, "failing": failing, "stuck": stuck}
+
+
+def print_summary(summary: dict):
+    counts = summary["counts"]
+    print("Jobs: " + ", ".join(f"{stage}={n}" for stage, n in counts.items()))
+
+    if summary["failing"]:
+        print(f"\nFailing ({len(summary['failing'])}):")
+        now = time.time()
+        for job in summary["failing"]:
+            if job["exhausted"]:
+                when = "gave up (--retry to try again)"
+            else:
+                wait = max(0, job["next_attempt_at"] - now)
+                when = f"next try in {wait:.0f}s"
+            print(
+                f"  {job['email']}: after {job['resume_stage']}, "
+                f"{job['attempts']} attempts, {when}\n"
+                f"    {job['last_error']}"
+            )
+
+    if summary["stuck"]:
+        print(f"\nStuck ({len(summary['stuck'])}, no progress for "
+              f"{JOB_STUCK_SECONDS // 60} min; a crashed run resumes them):")
+        for job in summary["stuck"]:
+            idle = (time.time() - job["updated_at"]) / 60
+            print(f"  {job['email']}: {job['stage']} for {idle:.0f} min")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion job queue")
+    parser.add_argument(
+        "--retry",
+        action="store_true",
+        help="retry failed jobs on the next ingest, resetting their attempts"
+    )
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.retry:
+        print(f"{retry_failed()} failed jobs will be retried")
+
+    print_summary(job_summary())
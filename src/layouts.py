@@ -0,0 +1,38 @@
+# src/layouts.py
+#
+# ID card layout templates for region-of-interest OCR (see _ocr_fields
+# in src/ocr.py). Boxes are (left, top, right, bottom) as fractions of the
+# card's width and height, so they work at any photo resolution. Each
+# field is OCR'd on its own with the given Tesseract page segmentation
+# mode (psm) and character whitelist.
+#
+# Select a layout with OCR_LAYOUT in src/config.py (None = whole card).
+# Adjust the boxes to your institution's card.
+
+# Tesseract page segmentation modes used below
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+
+ADMISSION_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-@"
+PHONE_CHARS = "+0123456789"
+
+LAYOUTS = {
+    # University of Delhi student ID card, landscape, photo on the left
+    "du_student_card": {
+        "name": {
+            "box": (0.30, 0.30, 0.98, 0.45),
+            "psm": PSM_SINGLE_LINE,
+            "whitelist": None,
+        },
+        "admission_no": {
+            "box": (0.30, 0.45, 0.98, 0.58),
+            "psm": PSM_SINGLE_LINE,
+            "whitelist": ADMISSION_CHARS,
+        },
+        "phone": {
+            "box": (0.30, 0.70, 0.98, 0.85),
+            "psm": PSM_SINGLE_LINE,
+            "whitelist": PHONE_CHARS,
+        },
+    },
+}
@@ -0,0 +1,288 @@
+# src/metrics.py
+#
+# Instrumentation for the ingestion pipeline: labelled counters and
+# latency histograms collected over one run, a printed run summary and
+# JSON / Prometheus text exports, plus an optional profiler hook.
+#
+#   from src import metrics
+#   metrics.inc("bytes_downloaded", len(content))
+#   with metrics.timed("stage_seconds", stage="download"):
+#       ...
+#
+# Everything is recorded in the calling process; OCR workers report
+# their per-image time back in the result (see extract_ocr).
+
+import io
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+PREFIX = "idcard_"
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = [
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1, 2.5, 5, 10, 30, 60, 120, 300, float("inf"),
+]
+
+HELP = {
+    "stage_seconds": "Time spent in each pipeline stage per batch",
+    "download_seconds": "Time to fetch one ID card (cache misses only)",
+    "ocr_seconds": "Time to OCR one ID card, measured in the OCR worker",
+    "rows_processed": "Form rows persisted",
+    "rows_skipped": "Form rows unchanged since the last run",
+    "rows_failed": "Form rows whose job failed, by stage",
+    "cards_unusable": "Unreadable ID cards, by stage (rows saved without OCR)",
+    "bytes_downloaded": "Bytes of ID card images downloaded",
+    "image_cache_hits": "ID cards served from the local cache",
+    "ocr_failures": "ID cards whose OCR raised an error",
+    "ocr_tier": "ID cards OCR'd, by the tier that produced the result",
+    "ocr_reused": "ID cards whose stored OCR output was reused",
+    "parse_misses": "Parsed rows missing an OCR field, by field",
+}
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus style)."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= q * self.count:
+                return bound
+        return BUCKETS[-1]
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {
+                str(bound): n for bound, n in zip(BUCKETS, self.counts)
+            },
+        }
+
+
+class Metrics:
+    """
+    Counters and histograms keyed by (name, labels). Safe to update
+    from several threads (the download stage is threaded).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = {}
+            self.histograms = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.histograms.setdefault(key, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timed(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        key = self._key(name, labels)
+        with self.lock:
+            return self.counters.get(key, 0)
+
+    def counters_by_label(self, name: str, label: str) -> dict:
+        """{label value: count} for one counter name."""
+        # Read while download threads may be adding counters
+        with self.lock:
+            counters = list(self.counters.items())
+
+        return {
+            dict(labels)[label]: value
+            for (n, labels), value in counters
+            if n == name and label in dict(labels)
+        }
+
+    def to_dict(self) -> dict:
+        def entry(key, value):
+            name, labels = key
+            return {"name": name, "labels": dict(labels), "value": value}
+
+        with self.lock:
+            return {
+                "started": self.started,
+                "duration_seconds": time.time() - self.started,
+                "counters": [
+                    entry(k, v) for k, v in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    entry(k, h.to_dict())
+                    for k, h in sorted(self.histograms.items())
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (e.g. for a textfile collector)."""
+        def label_str(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({n for n, _ in self.counters}):
+                metric = f"{PREFIX}{name}_total"
+                lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{metric}{label_str(labels)} {value}")
+
+            for name in sorted({n for n, _ in self.histograms}):
+                metric = f"{PREFIX}{name}"
+                lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (n, labels), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, h.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(
+                            f"{metric}_bucket{label_str(labels, [('le', le)])} "
+                            f"{cumulative}"
+                        )
+                    lines.append(f"{metric}_sum{label_str(labels)} {h.sum}")
+                    lines.append(f"{metric}_count{label_str(labels)} {h.count}")
+
+            lines.append(f"# TYPE {PREFIX}last_run_timestamp_seconds gauge")
+            lines.append(f"{PREFIX}last_run_timestamp_seconds {self.started}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_prometheus(self, path: str):
+        # Write then rename, so a collector never reads half a file
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        print(f"\n----- Run metrics ({time.time() - self.started:.1f}s) -----")
+
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        for (name, labels), h in histograms:
+            label = ",".join(v for _, v in labels)
+            print(
+                f"  {name + (f'[{label}]' if label else ''):<28} "
+                f"n={h.count:<6} total={h.sum:8.2f}s "
+                f"mean={h.sum / h.count:.3f}s p95<={h.quantile(0.95)}s"
+            )
+
+        for (name, labels), value in counters:
+            label = ",".join(v for _, v in labels)
+            print(f"  {name + (f'[{label}]' if label else ''):<28} {value:g}")
+
+
+# Metrics of the current run (reset by run_pipeline)
+_metrics = Metrics()
+
+inc = _metrics.inc
+observe = _metrics.observe
+timed = _metrics.timed
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+@contextmanager
+def profiled(mode: str | None, out_path: str | None = None, top: int = 20):
+    """
+    Profiles the enclosed code in this process: mode "cpu" uses cProfile
+    (stats also dumped to out_path if given, for snakeviz etc.), "memory"
+    uses tracemalloc. Prints the top entries. None does nothing.
+    """
+    if mode is None:
+        yield
+        return
+
+    if mode == "cpu":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            if out_path:
+                profiler.dump_stats(out_path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            print(out.getvalue())
+
+    elif mode == "memory":
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"\nPeak traced memory: {peak / 1024 / 1024:.1f} MiB")
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(f"  {stat}")
+            if out_path:
+                snapshot.dump(out_path)
+
+    else:
+        raise ValueError(f"Unknown profile mode: {mode}")
@@ -1,31 +1,410 @@
 # src/ocr.py
 
+import time
 from pathlib import Path
-from PIL import Image
-import pytesseract
+from multiprocessing import Pool, TimeoutError as PoolTimeoutError
 import cv2
 
+from src.config import (
+    OCR_WORKERS,
+    OCR_TIMEOUT_SECONDS,
+    OCR_BACKEND,
+    OCR_STORE_WORDS,
+    OCR_LAYOUT,
+    OCR_ESCALATE,
+    OCR_FAST_MAX_WIDTH,
+    OCR_REQUIRED_FIELDS
+)
+from src.ocr_backends import get_backend
+from src.layouts import LAYOUTS
+from src.parse import parse_ocr_result
 
-def extract_text(image_path: str) -> str:
-    """
-    Runs OCR on an image and returns raw extracted text.
-    """
+# Extra time allowed on top of the Tesseract timeout for image
+# loading and preprocessing before a worker counts as hung.
+WORKER_GRACE_SECONDS = 10
+
+
+def _load_gray(image_path: str):
     img_path = Path(image_path)
 
-    # Load image using OpenCV
-    image = cv2.imread(str(img_path))
+    # Load straight to grayscale (cached cards usually already are)
+    image = cv2.imread(str(img_path), cv2.IMREAD_GRAYSCALE)
     if image is None:
         raise FileNotFoundError(f"Could not load image: {image_path}")
 
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
 
+def _binarize(gray):
     # Light denoising / thresholding
-    gray = cv2.threshold(
+    return cv2.threshold(
         gray, 150, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
     )[1]
 
-    # OCR
-    text = pytesseract.image_to_string(gray)
 
-    return text
+def _adaptive_binarize(gray):
+    # Local thresholds cope with glare and uneven lighting
+    return cv2.adaptiveThreshold(
+        cv2.medianBlur(gray, 3), 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+    )
+
+
+def _downscale(gray, max_width: int = OCR_FAST_MAX_WIDTH):
+    height, width = gray.shape[:2]
+    scale = max_width / width
+    return cv2.resize(
+        gray, (max_width, max(1, round(height * scale))),
+        interpolation=cv2.INTER_AREA
+    )
+
+
+def _upscale(gray, factor: float = 2):
+    return cv2.resize(
+        gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC
+    )
+
+
+def _deskew(gray, max_angle: float = 30):
+    """
+    Straightens a slightly tilted card using the minimum-area
+    rectangle around its dark (text) pixels.
+    """
+    ink = cv2.threshold(
+        gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
+    )[1]
+    points = cv2.findNonZero(ink)
+    if points is None:
+        return gray
+
+    angle = cv2.minAreaRect(points)[-1]
+    # OpenCV reports the angle in [-90, 90] depending on version
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < 0.5 or abs(angle) > max_angle:
+        return gray
+
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        gray, matrix, (width, height),
+        flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE
+    )
+
+
+def _rotations(gray) -> list:
+    # Cards photographed sideways or upside down
+    return [
+        cv2.rotate(gray, cv2.ROTATE_90_CLOCKWISE),
+        cv2.rotate(gray, cv2.ROTATE_180),
+        cv2.rotate(gray, cv2.ROTATE_90_COUNTERCLOCKWISE),
+    ]
+
+
+# OCR passes from cheapest to most expensive. extract_ocr stops at the
+# first tier whose output parses every field in OCR_REQUIRED_FIELDS.
+# variants(gray) returns the images to try (at most max_variants);
+# an empty list skips the tier.
+OCR_TIERS = [
+    {
+        # Nothing to gain over "full" when the photo is already small
+        "name": "fast",
+        "variants": lambda gray: (
+            [_downscale(gray)] if gray.shape[1] > OCR_FAST_MAX_WIDTH else []
+        ),
+        "binarize": _binarize,
+        "max_variants": 1,
+    },
+    {
+        "name": "full",
+        "variants": lambda gray: [gray],
+        "binarize": _binarize,
+        "max_variants": 1,
+    },
+    {
+        "name": "deskew",
+        "variants": lambda gray: [_deskew(gray)],
+        "binarize": _adaptive_binarize,
+        "max_variants": 1,
+    },
+    {
+        "name": "rotated",
+        "variants": _rotations,
+        "binarize": _binarize,
+        "max_variants": 3,
+    },
+    {
+        "name": "upscaled",
+        "variants": lambda gray: [_upscale(_deskew(gray))],
+        "binarize": _adaptive_binarize,
+        "max_variants": 1,
+    },
+]
+
+
+def _tiers(escalate: bool) -> list:
+    if escalate:
+        return OCR_TIERS
+    return [tier for tier in OCR_TIERS if tier["name"] == "full"]
+
+
+def _ocr_fields(gray, layout: str, engine, timeout: float,
+                binarize=_binarize) -> dict:
+    """
+    OCRs only the field regions of a layout template, each with
+    its own Tesseract settings. Returns {field: text}.
+    """
+    height, width = gray.shape[:2]
+    fields = {}
+
+    for field, spec in LAYOUTS[layout].items():
+        left, top, right, bottom = spec["box"]
+        crop = gray[
+            int(top * height):int(bottom * height),
+            int(left * width):int(right * width)
+        ]
+        if crop.size == 0:
+            fields[field] = ""
+            continue
+
+        fields[field] = engine.image_to_string(
+            binarize(crop),
+            psm=spec["psm"],
+            whitelist=spec["whitelist"],
+            timeout=timeout
+        ).strip()
+
+    return fields
+
+
+def _ocr_image(gray, engine, layout, binarize, with_words, timeout) -> dict:
+    if layout:
+        fields = _ocr_fields(gray, layout, engine, timeout, binarize)
+        return {"text": "\n".join(fields.values()), "fields": fields, "words": None}
+
+    binary = binarize(gray)
+    if with_words:
+        text, words = engine.image_to_data(binary, timeout=timeout)
+    else:
+        text, words = engine.image_to_string(binary, timeout=timeout), None
+
+    return {"text": text, "fields": None, "words": words}
+
+
+def _required_fields_parsed(result: dict) -> int:
+    # A parser error only means this pass did not parse; the OCR
+    # text is still kept (and stored, so src.reparse can retry it)
+    try:
+        ocr_data, _ = parse_ocr_result(result)
+    except Exception:
+        return 0
+    return sum(bool(ocr_data.get(field)) for field in OCR_REQUIRED_FIELDS)
+
+
+def extract_ocr(image_path: str,
+                timeout: float = 0,
+                backend: str = OCR_BACKEND,
+                with_words: bool = False,
+                layout: str | None = OCR_LAYOUT,
+                escalate: bool = OCR_ESCALATE) -> dict:
+    """
+    Runs OCR on an image.
+    Returns {"text", "fields", "words", "backend", "tier", "seconds"}.
+
+    With a layout, only its field regions are OCR'd: fields maps each
+    field to its text and text joins them. Otherwise the whole card is
+    OCR'd and fields is None. words (word boxes with confidences) is
+    only filled in for whole-card OCR with with_words set.
+
+    With escalate, the OCR_TIERS are tried in order until the required
+    fields parse; tier names the pass whose output is returned (the
+    best one if none succeeded).
+    A non-zero timeout kills Tesseract after that many seconds
+    (pytesseract backend only).
+    """
+    start = time.perf_counter()
+    gray = _load_gray(image_path)
+    engine = get_backend(backend)
+
+    def finish(result):
+        return dict(
+            result, backend=engine.name, seconds=time.perf_counter() - start
+        )
+
+    best, best_parsed = None, -1
+    for tier in _tiers(escalate):
+        for image in tier["variants"](gray):
+            result = _ocr_image(
+                image, engine, layout, tier["binarize"], with_words, timeout
+            )
+            parsed = _required_fields_parsed(result)
+
+            if parsed > best_parsed:
+                best, best_parsed = dict(result, tier=tier["name"]), parsed
+            if best_parsed == len(OCR_REQUIRED_FIELDS):
+                return finish(best)
+
+    return finish(best)
+
+
+def _max_passes(layout: str | None, escalate: bool) -> int:
+    """Upper bound on Tesseract calls extract_ocr makes for one image."""
+    variants = sum(tier["max_variants"] for tier in _tiers(escalate))
+    return variants * (len(LAYOUTS[layout]) if layout else 1)
+
+
+def extract_text(image_path: str,
+                 timeout: float = 0,
+                 backend: str = OCR_BACKEND) -> str:
+    """
+    Runs OCR on an image and returns raw extracted text.
+    """
+    return extract_ocr(
+        image_path, timeout=timeout, backend=backend, layout=None
+    )["text"]
+
+
+def _extract_ocr_task(image_path: str,
+                      timeout: float,
+                      backend: str,
+                      with_words: bool,
+                      layout: str | None,
+                      escalate: bool) -> dict:
+    """
+    Pool entry point. Some pytesseract exceptions cannot be unpickled,
+    which would kill the pool's result handler, so errors are
+    re-raised as plain RuntimeErrors.
+    """
+    try:
+        return extract_ocr(
+            image_path, timeout, backend, with_words, layout, escalate
+        )
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+class OcrPool:
+    """
+    OCR worker processes kept across extract_ocr_batch calls, so each
+    worker's OCR engine is started once per run rather than per batch.
+
+        with OcrPool(workers) as pool:
+            for batch in batches:
+                extract_ocr_batch(batch, pool=pool)
+
+    A hung worker makes extract_ocr_batch restart the processes.
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS):
+        self.workers = max(1, workers)
+        self._pool = None
+
+    def get(self):
+        if self._pool is None:
+            self._pool = Pool(processes=self.workers)
+        return self._pool
+
+    def restart(self):
+        """Kills the workers; the next get() starts fresh ones."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def extract_ocr_batch(image_paths: list,
+                      workers: int = OCR_WORKERS,
+                      timeout: float = OCR_TIMEOUT_SECONDS,
+                      backend: str = OCR_BACKEND,
+                      with_words: bool = OCR_STORE_WORDS,
+                      layout: str | None = OCR_LAYOUT,
+                      escalate: bool = OCR_ESCALATE,
+                      on_done=None,
+                      pool: OcrPool | None = None) -> list:
+    """
+    Runs extract_ocr over many images on a process pool.
+    Each worker process keeps its own OCR engine alive across images.
+
+    Returns one entry per image, in input order: the extract_ocr dict,
+    or the exception raised for that image. An image whose worker
+    crashes or hangs past the timeout gets a TimeoutError; the pool is
+    then restarted and the unfinished images are resubmitted.
+    on_done, if given, is called with no arguments as each image finishes.
+    pool is an OcrPool to run on (workers is then ignored); without
+    one, a pool is started for this call only.
+    """
+    # Escalation may run several Tesseract passes per image
+    wait = (
+        timeout * _max_passes(layout, escalate) + WORKER_GRACE_SECONDS
+        if timeout else None
+    )
+
+    results = [None] * len(image_paths)
+    todo = list(range(len(image_paths)))
+    if not todo:
+        return results
+
+    own_pool = pool is None
+    if own_pool:
+        pool = OcrPool(min(workers, len(todo)))
+
+    try:
+        while todo:
+            processes = pool.get()
+            pending = [
+                (i, processes.apply_async(
+                    _extract_ocr_task,
+                    (image_paths[i], timeout, backend, with_words, layout, escalate)
+                ))
+                for i in todo
+            ]
+            todo = []
+            restart = False
+
+            for i, result in pending:
+                if restart:
+                    # Keep whatever finished before the pool is torn down
+                    if result.ready():
+                        try:
+                            results[i] = result.get()
+                        except Exception as e:
+                            results[i] = e
+                        if on_done:
+                            on_done()
+                    else:
+                        todo.append(i)
+                    continue
+
+                try:
+                    results[i] = result.get(timeout=wait)
+                except PoolTimeoutError:
+                    results[i] = TimeoutError(
+                        f"OCR worker crashed or timed out on {image_paths[i]}"
+                    )
+                    restart = True
+                except Exception as e:
+                    results[i] = e
+                if on_done:
+                    on_done()
+
+            if restart:
+                pool.restart()
+    finally:
+        if own_pool:
+            pool.close()
+
+    return results
@@ -0,0 +1,173 @@
+# src/ocr_backends.py
+
+import threading
+
+import numpy as np
+from PIL import Image
+import pytesseract
+
+from src.config import OCR_BACKEND, OCR_LANGUAGE
+
+try:
+    import tesserocr
+except ImportError:  # optional, see README
+    tesserocr = None
+
+
+class OcrBackend:
+    """
+    Interface for the engine behind src/ocr.py.
+
+    image is a grayscale or BGR numpy array. psm (Tesseract page
+    segmentation mode) and whitelist are optional per-call hints.
+    """
+
+    name = "base"
+
+    def image_to_string(self,
+                        image: np.ndarray,
+                        psm: int | None = None,
+                        whitelist: str | None = None,
+                        timeout: float = 0) -> str:
+        raise NotImplementedError
+
+    def image_to_data(self,
+                      image: np.ndarray,
+                      psm: int | None = None,
+                      whitelist: str | None = None,
+                      timeout: float = 0) -> tuple:
+        """
+        Returns (text, words), where words is a list of
+        {"text", "conf", "left", "top", "width", "height"} dicts.
+        """
+        raise NotImplementedError
+
+
+class PytesseractBackend(OcrBackend):
+    """
+    Runs the tesseract CLI once per image. Always available,
+    and the only backend that can enforce a per-image timeout.
+    """
+
+    name = "pytesseract"
+
+    def _config(self, psm, whitelist) -> str:
+        config = []
+        if psm is not None:
+            config.append(f"--psm {psm}")
+        if whitelist:
+            config.append(f"-c tessedit_char_whitelist={whitelist}")
+        return " ".join(config)
+
+    def image_to_string(self, image, psm=None, whitelist=None, timeout=0):
+        return pytesseract.image_to_string(
+            image,
+            lang=OCR_LANGUAGE,
+            config=self._config(psm, whitelist),
+            timeout=timeout
+        )
+
+    def image_to_data(self, image, psm=None, whitelist=None, timeout=0):
+        # The CLI needs a second run for word data
+        text = self.image_to_string(image, psm, whitelist, timeout)
+        data = pytesseract.image_to_data(
+            image,
+            lang=OCR_LANGUAGE,
+            config=self._config(psm, whitelist),
+            timeout=timeout,
+            output_type=pytesseract.Output.DICT
+        )
+
+        words = [
+            {
+                "text": data["text"][i],
+                "conf": float(data["conf"][i]),
+                "left": data["left"][i],
+                "top": data["top"][i],
+                "width": data["width"][i],
+                "height": data["height"][i],
+            }
+            for i in range(len(data["text"]))
+            if data["text"][i].strip()
+        ]
+        return text, words
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Keeps one initialized Tesseract engine (via the C API) alive and
+    reuses it across images, avoiding a process start and model load
+    per card. Hangs are left to the worker-level timeout in extract_ocr_batch.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self):
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed")
+
+        self.api = tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE)
+        self.default_psm = self.api.GetPageSegMode()
+        self.lock = threading.Lock()
+
+    def _recognize(self, image, psm, whitelist):
+        self.api.SetPageSegMode(
+            psm if psm is not None else self.default_psm
+        )
+        self.api.SetVariable("tessedit_char_whitelist", whitelist or "")
+
+        self.api.SetImage(Image.fromarray(image))
+        return self.api.GetUTF8Text()
+
+    def image_to_string(self, image, psm=None, whitelist=None, timeout=0):
+        with self.lock:
+            return self._recognize(image, psm, whitelist)
+
+    def image_to_data(self, image, psm=None, whitelist=None, timeout=0):
+        with self.lock:
+            text = self._recognize(image, psm, whitelist)
+
+            # Word results come from the same recognition pass
+            words = []
+            level = tesserocr.RIL.WORD
+            for r in tesserocr.iterate_level(self.api.GetIterator(), level):
+                word = r.GetUTF8Text(level)
+                if not word or not word.strip():
+                    continue
+                x1, y1, x2, y2 = r.BoundingBox(level)
+                words.append({
+                    "text": word,
+                    "conf": r.Confidence(level),
+                    "left": x1,
+                    "top": y1,
+                    "width": x2 - x1,
+                    "height": y2 - y1,
+                })
+
+        return text, words
+
+
+BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+# One engine per process (i.e. per OCR pool worker), created on first use
+_backends = {}
+
+
+def get_backend(name: str = OCR_BACKEND) -> OcrBackend:
+    """
+    Returns this process's engine for a backend name.
+    "auto" prefers tesserocr and falls back to pytesseract.
+    """
+    if name not in _backends:
+        if name == "auto":
+            try:
+                _backends[name] = get_backend(TesserocrBackend.name)
+            except Exception:
+                _backends[name] = get_backend(PytesseractBackend.name)
+        else:
+            _backends[name] = BACKENDS[name]()
+
+    return _backends[name]
@@ -1,6 +1,8 @@
 # src/parse.py
 
 import re
+from datetime import date
+
 from src.config import ADMISSION_REGEX, PHONE_REGEX
 
 
@@ -9,20 +11,12 @@ def parse_admission_number(text: str) -> dict | None:
     if not match:
         return None
 
-    admission_no = match.group()
-
-    # Example: BTH23-27@152304
-    course_code = admission_no[:3]
-    years_part = admission_no[3:8]   # "23-27"
-
-    start_year = 2000 + int(years_part[:2])
-    end_year = 2000 + int(years_part[3:])
-
+    # Example: BTH23-27@152304, BCOM24-27@123456
     return {
-        "admission_no": admission_no,
-        "course_code": course_code,
-        "admission_year": start_year,
-        "batch_end_year": end_year
+        "admission_no": match.group(),
+        "course_code": match.group("course"),
+        "admission_year": 2000 + int(match.group("start")),
+        "batch_end_year": 2000 + int(match.group("end"))
     }
 
 
@@ -58,3 +52,83 @@ def parse_name(text: str) -> str | None:
 
     return None
 
+
+def compute_year_of_study(admission_year: int) -> int:
+    """
+    Computes year of study using Aug 1 cutoff.
+    """
+    today = date.today()
+    cutoff = date(admission_year, 8, 1)
+
+    delta_years = (today - cutoff).days / 365.25
+
+    year = int(delta_years) + 1
+    return min(max(year, 1), 6)
+
+
+def _derive(admission_info: dict) -> dict:
+    if not admission_info:
+        return {}
+
+    return {
+        "admission_year": admission_info["admission_year"],
+        "batch_end_year": admission_info["batch_end_year"],
+        "computed_year": compute_year_of_study(
+            admission_info["admission_year"]
+        )
+    }
+
+
+def parse_ocr_text(raw_text: str) -> tuple:
+    """
+    Parses raw OCR text of an ID card into the (ocr_data, derived_data)
+    dicts stored in the database.
+    """
+    admission_info = parse_admission_number(raw_text) or {}
+    ocr_data = {
+        "name": parse_name(raw_text),
+        "admission_no": admission_info.get("admission_no"),
+        "phone": parse_phone_number(raw_text)
+    }
+
+    return ocr_data, _derive(admission_info)
+
+
+def clean_field_name(text: str) -> str | None:
+    """
+    Name from a name-field crop: the label, if the crop caught it,
+    is dropped and the same two-word sanity check as parse_name applies.
+    """
+    cleaned = text.replace("\n", " ")
+    for label in ("Student's Name", "Student Name", "Name", ":"):
+        cleaned = cleaned.replace(label, "")
+    cleaned = " ".join(cleaned.split())
+
+    if len(cleaned.split()) >= 2:
+        return cleaned
+    return None
+
+
+def parse_fields(fields: dict) -> tuple:
+    """
+    Like parse_ocr_text, for per-field text from region-of-interest
+    OCR ({"name": ..., "admission_no": ..., "phone": ...}).
+    """
+    admission_info = parse_admission_number(fields.get("admission_no") or "") or {}
+    ocr_data = {
+        "name": clean_field_name(fields.get("name") or ""),
+        "admission_no": admission_info.get("admission_no"),
+        "phone": parse_phone_number(fields.get("phone") or "")
+    }
+
+    return ocr_data, _derive(admission_info)
+
+
+def parse_ocr_result(result: dict) -> tuple:
+    """
+    Parses an OCR result dict (see extract_ocr in src/ocr.py),
+    using its per-field text when it has any.
+    """
+    if result.get("fields"):
+        return parse_fields(result["fields"])
+    return parse_ocr_text(result.get("text") or "")
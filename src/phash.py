@@ -0,0 +1,282 @@
+# src/phash.py
+#
+# Perceptual hashes of downloaded ID card images. A volunteer who
+# resubmits the form usually uploads the same photo again, which gets a
+# new Drive file ID and often different bytes (re-encoded or resized),
+# so the content-hash cache misses it. A near-identical perceptual hash
+# lets ingestion reuse the stored OCR output instead of running OCR, and
+# each such match is queued for an operator to confirm.
+#
+# Usage:
+#   python -m src.phash --index          # hash images already in the cache
+#   python -m src.phash --review         # list matches awaiting review
+#   python -m src.phash --accept HASH
+#   python -m src.phash --reject HASH    # OCR that card on the next ingest
+
+import time
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.config import PHASH_MAX_DISTANCE
+from src.database import get_connection, init_db, transaction
+
+# Must match the band0..band3 columns of image_phashes
+PHASH_BANDS = 4
+BAND_BITS = 64 // PHASH_BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def image_phash(image_path: str) -> int:
+    """
+    64-bit DCT perceptual hash: one bit per low-frequency coefficient
+    of a 32x32 thumbnail, set when it is above the median.
+    """
+    gray = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise FileNotFoundError(f"Could not load image: {image_path}")
+
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].flatten()
+    # The DC term is overall brightness, so leave it out of the median
+    bits = low > np.median(low[1:])
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _bands(phash: int) -> list:
+    return [(phash >> (BAND_BITS * i)) & BAND_MASK for i in range(PHASH_BANDS)]
+
+
+def _to_sqlite(phash: int) -> int:
+    # SQLite integers are signed 64-bit
+    return phash - (1 << 64) if phash >= 1 << 63 else phash
+
+
+def _from_sqlite(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def index_images(phashes: dict):
+    """Stores {content_hash: phash}; already indexed images keep their row."""
+    now = time.time()
+    with transaction() as conn:
+        conn.executemany("""
+        INSERT INTO image_phashes (
+            content_hash, phash, band0, band1, band2, band3, indexed_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash) DO NOTHING;
+        """, [
+            (content_hash, _to_sqlite(phash), *_bands(phash), now)
+            for content_hash, phash in phashes.items()
+        ])
+
+
+def find_near_duplicate(phash: int,
+                        exclude: str | None = None,
+                        max_distance: int = PHASH_MAX_DISTANCE) -> tuple | None:
+    """
+    Returns (content_hash, distance) of the closest indexed image that
+    has stored OCR output, or None if none is within max_distance bits.
+    Only images sharing a band are compared (see image_phashes).
+    """
+    cur = get_connection().cursor()
+    bands = _bands(phash)
+
+    cur.execute("""
+        SELECT p.content_hash, p.phash
+        FROM image_phashes p
+        JOIN ocr_results o ON o.content_hash = p.content_hash
+        WHERE (p.band0 = ? OR p.band1 = ? OR p.band2 = ? OR p.band3 = ?)
+          AND p.content_hash != ?;
+    """, (*bands, exclude or ""))
+
+    best = None
+    for content_hash, value in cur.fetchall():
+        distance = hamming(phash, _from_sqlite(value))
+        if distance <= max_distance and (best is None or distance < best[1]):
+            best = (content_hash, distance)
+
+    return best
+
+
+def match_near_duplicates(paths_by_hash: dict,
+                          workers: int = 4,
+                          max_distance: int = PHASH_MAX_DISTANCE) -> dict:
+    """
+    Indexes the images in {content_hash: path} and returns
+    {content_hash: (duplicate_of, distance)} for those that are near
+    duplicates of an image with stored OCR output. Images an operator
+    has rejected as duplicates are never matched again.
+    """
+    if max_distance is None or not paths_by_hash:
+        return {}
+
+    cur = get_connection().cursor()
+    hashes = list(paths_by_hash)
+
+    known = {}
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        cur.execute(f"""
+            SELECT content_hash, phash, match_status FROM image_phashes
+            WHERE content_hash IN ({", ".join("?" * len(chunk))});
+        """, chunk)
+        for content_hash, value, status in cur.fetchall():
+            known[content_hash] = (_from_sqlite(value), status)
+
+    new = [h for h in hashes if h not in known]
+
+    def safe_phash(content_hash):
+        try:
+            return image_phash(paths_by_hash[content_hash])
+        except Exception as e:
+            print(f"Perceptual hash failed for {paths_by_hash[content_hash]}: {e}")
+            return None
+
+    # OpenCV releases the GIL while decoding
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        computed = dict(zip(new, executor.map(safe_phash, new)))
+
+    computed = {h: p for h, p in computed.items() if p is not None}
+    index_images(computed)
+
+    phashes = {h: p for h, (p, status) in known.items() if status != "rejected"}
+    phashes.update(computed)
+
+    matches = {}
+    for content_hash, phash in phashes.items():
+        match = find_near_duplicate(phash, content_hash, max_distance)
+        if match:
+            matches[content_hash] = match
+
+    return matches
+
+
+def record_matches(matches: dict):
+    """Flags {content_hash: (duplicate_of, distance)} for operator review."""
+    with transaction() as conn:
+        conn.executemany("""
+        UPDATE image_phashes
+        SET duplicate_of = ?, distance = ?, match_status = 'pending'
+        WHERE content_hash = ?;
+        """, [
+            (duplicate_of, distance, content_hash)
+            for content_hash, (duplicate_of, distance) in matches.items()
+        ])
+
+
+def pending_matches() -> list:
+    """
+    Matches awaiting review, with the students on each side:
+    [{"content_hash", "duplicate_of", "distance", "emails", "matched_emails"}]
+    """
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    cur.execute("""
+        SELECT p.content_hash, p.duplicate_of, p.distance,
+               (SELECT GROUP_CONCAT(email, ', ') FROM students
+                WHERE image_hash = p.content_hash) AS emails,
+               (SELECT GROUP_CONCAT(email, ', ') FROM students
+                WHERE image_hash = p.duplicate_of) AS matched_emails
+        FROM image_phashes p
+        WHERE p.match_status = 'pending'
+        ORDER BY p.distance DESC, p.indexed_at;
+    """)
+    return [dict(row) for row in cur.fetchall()]
+
+
+def accept_match(content_hash: str) -> bool:
+    with transaction() as conn:
+        cur = conn.execute("""
+            UPDATE image_phashes SET match_status = 'accepted'
+            WHERE content_hash = ? AND duplicate_of IS NOT NULL;
+        """, (content_hash,))
+        return cur.rowcount > 0
+
+
+def reject_match(content_hash: str) -> bool:
+    """
+    Drops the reused OCR output of a wrongly matched image and forgets
+    the fingerprints of its students, so the next ingest OCRs it.
+    """
+    with transaction() as conn:
+        cur = conn.execute("""
+            UPDATE image_phashes SET match_status = 'rejected'
+            WHERE content_hash = ? AND duplicate_of IS NOT NULL;
+        """, (content_hash,))
+        if not cur.rowcount:
+            return False
+
+        conn.execute(
+            "DELETE FROM ocr_results WHERE content_hash = ?",
+            (content_hash,)
+        )
+        conn.execute("""
+            DELETE FROM submission_fingerprints
+            WHERE email IN (SELECT email FROM students WHERE image_hash = ?);
+        """, (content_hash,))
+        return True
+
+
+def index_cached_images(workers: int = 4) -> int:
+    """Indexes every image in the download cache. Returns the count."""
+    cur = get_connection().cursor()
+    cur.execute("""
+        SELECT DISTINCT c.content_hash, c.path
+        FROM image_cache c
+        LEFT JOIN image_phashes p ON p.content_hash = c.content_hash
+        WHERE p.content_hash IS NULL;
+    """)
+    todo = cur.fetchall()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        computed = list(executor.map(
+            lambda item: (item[0], image_phash(item[1])), todo
+        ))
+
+    index_images(dict(computed))
+    return len(computed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perceptual-hash index of ID cards")
+    parser.add_argument("--index", action="store_true", help="hash cached images")
+    parser.add_argument("--review", action="store_true", help="list pending matches")
+    parser.add_argument("--accept", metavar="HASH", help="confirm a match")
+    parser.add_argument("--reject", metavar="HASH", help="reject a match")
+    args = parser.parse_args()
+
+    init_db()
+
+    if args.index:
+        print(f"Indexed {index_cached_images()} images")
+
+    if args.accept:
+        print("Accepted" if accept_match(args.accept) else "No such match")
+
+    if args.reject:
+        print(
+            "Rejected; the card will be OCR'd on the next ingest"
+            if reject_match(args.reject) else "No such match"
+        )
+
+    if args.review or not (args.index or args.accept or args.reject):
+        matches = pending_matches()
+        print(f"{len(matches)} matches awaiting review\n")
+        for m in matches:
+            print(f"{m['content_hash']}  distance {m['distance']}")
+            print(f"  students : {m['emails'] or '-'}")
+            print(f"  reuses   : {m['duplicate_of']} ({m['matched_emails'] or '-'})")
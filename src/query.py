@@ -1,13 +1,13 @@
 # src/query.py
 
 import sqlite3
-from src.database import get_connection
-from src.validate import validate_record
+from src.database import get_connection, STUDENT_SORT_KEYS
+from src.validate import stored_scores
 
 def get_unallocated():
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("""
         SELECT * FROM students
@@ -15,62 +15,199 @@ def get_unallocated():
     """)
 
     rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
     return rows
 
 def get_unallocated_by_category(category: str):
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("""
-        SELECT * FROM students
-        WHERE allocated = 0
-          AND typed_categories LIKE ?
-    """, (f"%{category}%",))
+        SELECT s.* FROM student_categories c
+        JOIN students s ON s.email = c.email
+        WHERE c.category = ?
+          AND s.allocated = 0
+    """, (category,))
 
     rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
     return rows
 
 def get_candidates(category: str, min_confidence: float = 0.8):
-    candidates = get_unallocated_by_category(category)
+    """
+    Unallocated students in a category whose stored overall
+    confidence is at least min_confidence, as (row, scores) pairs.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
 
-    qualified = []
-    for row in candidates:
-        scores = validate_record(row)
-        if scores["overall_confidence"] >= min_confidence:
-            qualified.append((row, scores))
+    cur.execute("""
+        SELECT s.* FROM student_categories c
+        JOIN students s ON s.email = c.email
+        WHERE c.category = ?
+          AND s.allocated = 0
+          AND s.overall_confidence >= ?
+    """, (category, min_confidence))
 
-    return qualified
+    rows = [dict(row) for row in cur.fetchall()]
+    return [(row, stored_scores(row)) for row in rows]
 
 def get_all_students():
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("SELECT * FROM students")
     rows = [dict(row) for row in cur.fetchall()]
 
-    conn.close()
     return rows
 
 
 def get_students_by_category(category: str):
     conn = get_connection()
-    conn.row_factory = sqlite3.Row
     cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
 
     cur.execute("""
-        SELECT * FROM students
-        WHERE typed_categories LIKE ?
-    """, (f"%{category}%",))
+        SELECT s.* FROM student_categories c
+        JOIN students s ON s.email = c.email
+        WHERE c.category = ?
+    """, (category,))
 
     rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
     return rows
 
 
+def _student_filters(categories: list | None = None,
+                     match: str = "any",
+                     allocation: str | None = None,
+                     min_confidence: float | None = None,
+                     event: str | None = None) -> tuple:
+    """
+    WHERE clauses and parameters over students for the dashboard filters:
+
+      categories      students in any (match="any") or all (match="all")
+                      of these categories
+      allocation      "allocated" or "unallocated" (None for both)
+      min_confidence  stored overall_confidence at least this
+      event           allocated to this event
+    """
+    clauses = []
+    params = []
+
+    if categories:
+        categories = list(dict.fromkeys(categories))
+        placeholders = ", ".join("?" * len(categories))
+
+        if match == "any":
+            clauses.append(f"""
+                EXISTS (
+                    SELECT 1 FROM student_categories c
+                    WHERE c.email = students.email
+                      AND c.category IN ({placeholders})
+                )
+            """)
+        elif match == "all":
+            clauses.append(f"""
+                (
+                    SELECT COUNT(*) FROM student_categories c
+                    WHERE c.email = students.email
+                      AND c.category IN ({placeholders})
+                ) = {len(categories)}
+            """)
+        else:
+            raise ValueError(f"Unknown category match: {match}")
+        params.extend(categories)
+
+    if allocation == "allocated":
+        clauses.append("allocated = 1")
+    elif allocation == "unallocated":
+        clauses.append("allocated = 0")
+    elif allocation is not None:
+        raise ValueError(f"Unknown allocation filter: {allocation}")
+
+    if min_confidence is not None:
+        clauses.append("overall_confidence >= ?")
+        params.append(min_confidence)
+
+    if event is not None:
+        clauses.append("allocated_event = ?")
+        params.append(event)
+
+    return clauses, params
+
+
+def _where(clauses: list) -> str:
+    return ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+
+def count_students(**filters) -> int:
+    """Number of students matching the dashboard filters (see _student_filters)."""
+    clauses, params = _student_filters(**filters)
+
+    cur = get_connection().cursor()
+    cur.execute(f"SELECT COUNT(*) FROM students {_where(clauses)}", params)
+    return cur.fetchone()[0]
+
+
+def get_students(**filters) -> list:
+    """Every student matching the dashboard filters, in one query."""
+    clauses, params = _student_filters(**filters)
+
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+    cur.execute(f"SELECT * FROM students {_where(clauses)}", params)
+
+    return [dict(row) for row in cur.fetchall()]
+
+
+def get_students_page(sort: str = "name",
+                      descending: bool = False,
+                      limit: int = 50,
+                      after: tuple | None = None,
+                      **filters) -> tuple:
+    """
+    One page of students matching the dashboard filters (see
+    _student_filters), ordered by a STUDENT_SORT_KEYS key (ties broken
+    by email).
+
+    Keyset pagination: pass the returned cursor as after to get the
+    next page. Returns (rows, cursor); cursor is None on the last page.
+    Each page costs the same however deep it is.
+    """
+    if sort not in STUDENT_SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    key = STUDENT_SORT_KEYS[sort]
+    order = "DESC" if descending else "ASC"
+
+    clauses, params = _student_filters(**filters)
+    if after is not None:
+        clauses.append(f"({key}, email) {'<' if descending else '>'} (?, ?)")
+        params.extend(after)
+
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    # One extra row tells whether there is a next page
+    cur.execute(f"""
+        SELECT *, {key} AS sort_key FROM students
+        {_where(clauses)}
+        ORDER BY {key} {order}, email {order}
+        LIMIT ?
+    """, params + [limit + 1])
+
+    rows = [dict(row) for row in cur.fetchall()]
+
+    cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = (rows[-1]["sort_key"], rows[-1]["email"])
+
+    for row in rows:
+        del row["sort_key"]
+    return rows, cursor
+
+
 def allocate_student(email: str, event_name: str):
     conn = get_connection()
     cur = conn.cursor()
@@ -83,7 +220,6 @@ def allocate_student(email: str, event_name: str):
     """, (event_name, email))
 
     conn.commit()
-    conn.close()
 
 def unallocate_student(email: str):
     conn = get_connection()
@@ -97,4 +233,3 @@ def unallocate_student(email: str):
     """, (email,))
 
     conn.commit()
-    conn.close()
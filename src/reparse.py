@@ -0,0 +1,63 @@
+# src/reparse.py
+#
+# Re-runs the parsing rules (src/parse.py) and derived year computation
+# over the raw OCR text stored in ocr_results, without downloading or
+# OCRing anything. Use after changing ADMISSION_REGEX or the name rules.
+#
+# Usage:
+#   python -m src.reparse
+
+import json
+import sqlite3
+
+from src.database import get_connection, init_db, upsert_students
+from src.parse import parse_ocr_result
+
+
+def reparse_all() -> int:
+    """
+    Re-parses every student whose ID card OCR output is stored.
+    Returns the number of students updated.
+    """
+    init_db()
+
+    cur = get_connection().cursor()
+    cur.row_factory = sqlite3.Row
+
+    cur.execute("""
+        SELECT s.email, s.typed_name, s.typed_course_code,
+               s.typed_year_of_study, s.typed_phone, s.typed_categories,
+               s.image_hash, o.raw_text, o.fields_json
+        FROM students s
+        JOIN ocr_results o ON o.content_hash = s.image_hash
+    """)
+
+    records = []
+    for row in cur.fetchall():
+        form_data = {
+            "email": row["email"],
+            "name": row["typed_name"],
+            "course_code": row["typed_course_code"],
+            "year_of_study": row["typed_year_of_study"],
+            "phone": row["typed_phone"],
+            "categories_csv": row["typed_categories"]
+        }
+
+        ocr_data, derived_data = parse_ocr_result({
+            "text": row["raw_text"],
+            "fields": json.loads(row["fields_json"]) if row["fields_json"] else None
+        })
+        ocr_data["image_hash"] = row["image_hash"]
+
+        records.append((form_data, ocr_data, derived_data))
+
+    failures = upsert_students(records)
+    for email, e in failures:
+        print(f"Failed for {email}: {e}")
+
+    return len(records) - len(failures)
+
+
+if __name__ == "__main__":
+    updated = reparse_all()
+    print(f"Re-parsed {updated} students from stored OCR text")
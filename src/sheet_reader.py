@@ -1,12 +1,120 @@
 # src/sheet_reader.py
 
+import os
+import json
+import hashlib
+from io import BytesIO
+from pathlib import Path
+
 import pandas as pd
-from src.sheet_config import SHEET_EXPORT_URL
+import requests
+
+from src.config import SHEET_CACHE_DIR, SHEET_FETCH_TIMEOUT
+
+# Form columns used by the ingestion pipeline. Everything is read as
+# text: phone numbers must not become floats, and process_single_submission
+# does its own conversions. Other columns in the sheet are not loaded.
+RESPONSE_COLUMNS = {
+    "Timestamp": str,
+    "Email address": str,
+    "Name": str,
+    "Course": str,
+    "Year of Study": str,
+    "WhatsApp Number": str,
+    "ID Card": str,
+    "What categories would you like to volunteer for": str,
+}
+
+CACHE_BODY = Path(SHEET_CACHE_DIR) / "responses.csv"
+CACHE_META = Path(SHEET_CACHE_DIR) / "responses.json"
+
+
+def csv_export_url(url: str) -> str:
+    """
+    Switches a Google Sheets export URL to the CSV format,
+    which is much cheaper to download and parse than XLSX.
+    """
+    if "/export" in url and "format=xlsx" in url:
+        return url.replace("format=xlsx", "format=csv")
+    return url
+
+
+def _parse(data, is_excel: bool) -> pd.DataFrame:
+    usecols = lambda col: col in RESPONSE_COLUMNS
+
+    if is_excel:
+        return pd.read_excel(data, usecols=usecols, dtype=RESPONSE_COLUMNS)
+    return pd.read_csv(data, usecols=usecols, dtype=RESPONSE_COLUMNS)
+
+
+def _load_meta() -> dict:
+    if CACHE_META.exists() and CACHE_BODY.exists():
+        return json.loads(CACHE_META.read_text())
+    return {}
+
+
+def _fetch_remote(url: str) -> tuple:
+    """
+    Conditional GET of the sheet export. Returns (body, changed);
+    an unchanged sheet is served from the local cache.
+    """
+    meta = _load_meta()
+    if meta.get("url") != url:
+        meta = {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = requests.get(url, headers=headers, timeout=SHEET_FETCH_TIMEOUT)
+
+    if r.status_code == 304:
+        return CACHE_BODY.read_bytes(), False
+
+    r.raise_for_status()
+
+    body = r.content
+    content_hash = hashlib.sha256(body).hexdigest()
+    changed = content_hash != meta.get("sha256")
+
+    os.makedirs(SHEET_CACHE_DIR, exist_ok=True)
+    CACHE_BODY.write_bytes(body)
+    CACHE_META.write_text(json.dumps({
+        "url": url,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "sha256": content_hash,
+    }))
+
+    return body, changed
+
+
+def fetch_responses(source: str | None = None) -> tuple:
+    """
+    Reads Google Form responses into a DataFrame.
+
+    source may be a sheet export URL or a local .csv/.xlsx file;
+    it defaults to SHEET_EXPORT_URL from src/sheet_config.py.
+    Returns (df, changed), where changed is False when the sheet
+    is known to be identical to the previous fetch.
+    """
+    if source is None:
+        # Imported here so a local file can be read without sheet_config
+        from src.sheet_config import SHEET_EXPORT_URL
+        source = csv_export_url(SHEET_EXPORT_URL)
+
+    if os.path.exists(source):
+        return _parse(source, source.endswith((".xlsx", ".xls"))), True
+
+    body, changed = _fetch_remote(source)
+    return _parse(BytesIO(body), "format=xlsx" in source), changed
 
 
-def read_responses():
+def read_responses(source: str | None = None) -> pd.DataFrame:
     """
     Reads Google Form responses into a DataFrame.
     """
-    df = pd.read_excel(SHEET_EXPORT_URL)
+    df, _ = fetch_responses(source)
     return df
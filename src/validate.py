@@ -2,6 +2,18 @@
 
 from difflib import SequenceMatcher
 
+import numpy as np
+
+from src.config import SCORE_WEIGHTS
+
+# Columns under which validate_record's scores are stored in students
+SCORE_FIELDS = [
+    "name_score",
+    "phone_score",
+    "year_score",
+    "overall_confidence",
+]
+
 def name_similarity(name1: str | None, name2: str | None) -> float:
     if not name1 or not name2:
         return 0.0
@@ -35,9 +47,100 @@ def validate_record(row: dict) -> dict:
 
     # weighted overall confidence
     scores["overall_confidence"] = (
-        0.4 * scores["name_score"] +
-        0.3 * scores["phone_score"] +
-        0.3 * scores["year_score"]
+        SCORE_WEIGHTS["name"] * scores["name_score"] +
+        SCORE_WEIGHTS["phone"] * scores["phone_score"] +
+        SCORE_WEIGHTS["year"] * scores["year_score"]
+    )
+
+    return scores
+
+def stored_scores(row: dict) -> dict:
+    """
+    Returns the scores persisted with a DB row,
+    computing them if the row predates stored scores.
+    """
+    if row.get("overall_confidence") is None:
+        return validate_record(row)
+    return {field: row[field] for field in SCORE_FIELDS}
+
+
+def _normalize_names(names) -> list:
+    return [name.lower().strip() if name else None for name in names]
+
+
+def _batch_name_similarity(typed: list, ocr: list) -> np.ndarray:
+    """
+    name_similarity over two aligned lists of normalized names.
+    """
+    scores = np.zeros(len(typed), dtype=np.float64)
+
+    idx = [i for i, (a, b) in enumerate(zip(typed, ocr))
+           if a is not None and b is not None]
+    if not idx:
+        return scores
+
+    left = [typed[i] for i in idx]
+    right = [ocr[i] for i in idx]
+
+    # Repeated pairs (clean scans of common names) are scored once
+    cache = {}
+    for i, pair in zip(idx, zip(left, right)):
+        if pair not in cache:
+            cache[pair] = SequenceMatcher(None, *pair).ratio()
+        scores[i] = cache[pair]
+
+    return scores
+
+
+def _batch_exact_match(a_values, b_values) -> np.ndarray:
+    return np.fromiter(
+        (
+            0.0 if a is None or b is None else float(str(a) == str(b))
+            for a, b in zip(a_values, b_values)
+        ),
+        dtype=np.float64,
+        count=len(a_values)
+    )
+
+
+def validate_records(rows: list) -> list:
+    """
+    Batch version of validate_record for many DB rows (as dicts),
+    with identical results. Names are normalized once and each
+    distinct name pair is compared once; the weighted confidence is
+    combined with array operations.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+
+    name = _batch_name_similarity(
+        _normalize_names([row["typed_name"] for row in rows]),
+        _normalize_names([row["ocr_name"] for row in rows])
+    )
+    phone = _batch_exact_match(
+        [row["typed_phone"] for row in rows],
+        [row["ocr_phone"] for row in rows]
+    )
+    year = _batch_exact_match(
+        [row["typed_year_of_study"] for row in rows],
+        [row["computed_year_of_study"] for row in rows]
+    )
+
+    overall = (
+        SCORE_WEIGHTS["name"] * name +
+        SCORE_WEIGHTS["phone"] * phone +
+        SCORE_WEIGHTS["year"] * year
     )
 
-    return scores
\ No newline at end of file
+    return [
+        {
+            "name_score": n,
+            "phone_score": p,
+            "year_score": y,
+            "overall_confidence": o,
+        }
+        for n, p, y, o in zip(
+            name.tolist(), phone.tolist(), year.tolist(), overall.tolist()
+        )
+    ]
@@ -1,12 +1,12 @@
 from src.database import fetch_all_students_as_dict
-from src.validate import validate_record
+from src.validate import stored_scores
 
 
 def run_validation():
     rows = fetch_all_students_as_dict()
 
     for row in rows:
-        scores = validate_record(row)
+        scores = stored_scores(row)
         print(
             row["email"],
             "→",